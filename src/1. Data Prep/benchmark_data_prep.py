@@ -0,0 +1,175 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from change_extension import ChangeExtension
+from data_extraction import DataExtracter
+from impute_missing_value import ImputeMissingValue
+from stage_timer import StageTimer, psutil
+from synthetic_corpus import SyntheticCorpus
+
+
+def count_records(folder):
+    """Records in the .ndjson files DataExtracter wrote, one per line."""
+    records = 0
+    for file_path in glob.glob(os.path.join(folder, "*.ndjson")):
+        with open(file_path, "rb") as f:
+            records += sum(1 for line in f if line.strip())
+    return records
+
+
+def run_benchmark(corpus, work_folder, workers=1):
+    """Generate the corpus and time every data prep stage on it, like main.py runs them."""
+    timer = StageTimer()
+    raw_folder = os.path.join(work_folder, "raw")
+    extracted_folder = os.path.join(work_folder, "extracted")
+    imputed_folder = os.path.join(work_folder, "imputed")
+
+    with timer.stage("generate", 0):
+        file_count = corpus.write(raw_folder)
+    timer.stages["generate"]["records"] = file_count
+
+    with timer.stage("change_extension", file_count):
+        ChangeExtension().change_extension(raw_folder)
+
+    with timer.stage("extract", file_count):
+        DataExtracter(
+            raw_folder, extracted_folder, workers=workers
+        ).process_json_files()
+
+    # A new country cache every run, so the fuzzy matching is always timed
+    imputer = ImputeMissingValue(
+        country_cache_path=os.path.join(work_folder, "country_cache.json"),
+        output_format="parquet",
+        workers=workers,
+        global_author_index=True,
+        sample_rss=True,
+    )
+    with timer.stage("impute", count_records(extracted_folder)):
+        file_stats = imputer.run(extracted_folder, imputed_folder)
+    # The steps of every file as timed inside process_file, with workers their
+    # seconds add up to more than the impute wall time
+    for stats in file_stats or []:
+        timer.merge(stats["stages"], prefix="impute.")
+
+    return timer.results()
+
+
+def find_regressions(results, baseline, tolerance):
+    """List the stages that got slower or used more memory than tolerance allows.
+
+    Each regression is (stage, what, baseline value, ratio to the baseline).
+    """
+    regressions = []
+    for name, stats in results["stages"].items():
+        if name == "generate":
+            continue  # Corpus generation is setup, not part of data prep
+        baseline_stats = baseline["stages"].get(name)
+        if not baseline_stats:
+            continue
+        if baseline_stats["records_per_sec"]:
+            ratio = stats["records_per_sec"] / baseline_stats["records_per_sec"]
+            if ratio < 1 - tolerance:
+                regressions.append(
+                    (name, "records/sec", baseline_stats["records_per_sec"], ratio)
+                )
+        if stats["peak_rss_mb"] and baseline_stats.get("peak_rss_mb"):
+            ratio = stats["peak_rss_mb"] / baseline_stats["peak_rss_mb"]
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    (name, "MB peak RSS", baseline_stats["peak_rss_mb"], ratio)
+                )
+    return regressions
+
+
+def print_results(stages):
+    print(f"\n{'Stage':<32}{'Seconds':>10}{'Records/sec':>14}{'Peak RSS MB':>14}")
+    for name, stats in stages.items():
+        peak = stats["peak_rss_mb"]
+        print(
+            f"{name:<32}{stats['seconds']:>10.2f}{stats['records_per_sec']:>14.1f}"
+            f"{peak if peak is not None else float('nan'):>14.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the data prep stages on a synthetic Scopus corpus."
+    )
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--papers", type=int, default=1000, help="Papers per year")
+    parser.add_argument("--authors", type=int, default=5000, help="Distinct authors")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed drop in records/sec, or rise in peak RSS, before a stage "
+        "counts as a regression",
+    )
+    parser.add_argument("--keep", action="store_true", help="Keep the work folder")
+    args = parser.parse_args()
+
+    if psutil is None:
+        print("psutil is not installed, the peak RSS of each stage is not measured")
+
+    corpus = SyntheticCorpus(
+        years=args.years, papers=args.papers, authors=args.authors, seed=args.seed
+    )
+    work_folder = tempfile.mkdtemp(prefix="data_prep_benchmark_")
+    try:
+        stages = run_benchmark(corpus, work_folder, workers=args.workers)
+    finally:
+        if args.keep:
+            print(f"Work folder kept at {work_folder}")
+        else:
+            shutil.rmtree(work_folder, ignore_errors=True)
+
+    results = {
+        "corpus": {
+            "years": args.years,
+            "papers": args.papers,
+            "authors": args.authors,
+            "seed": args.seed,
+        },
+        "workers": args.workers,
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "stages": stages,
+    }
+    print_results(stages)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["corpus"] != results["corpus"]:
+            print("Warning: the baseline was run on a different corpus size")
+        if baseline.get("workers") != results["workers"]:
+            print("Warning: the baseline was run with a different number of workers")
+
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for name, what, baseline_value, ratio in regressions:
+            print(
+                f"REGRESSION {name}: {ratio:.0%} of the baseline "
+                f"{baseline_value:.1f} {what}"
+            )
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import glob
+import os
+import time
+
+from data_extraction import DataExtracter
+from record_parser import available_backends
+
+
+def find_json_files(folder_path):
+    """Find every Scopus record below the folder."""
+    return sorted(glob.glob(os.path.join(folder_path, "**", "*.json"), recursive=True))
+
+
+def benchmark_backends(folder_path, json_files, repeat=3):
+    """Time clean_data with every installed backend and check the results match."""
+    results = {}
+    expected = None
+    # Start with json so the other backends are compared against the stdlib
+    for backend in reversed(available_backends()):
+        # Nothing is written, so the input folder doubles as the output folder
+        extracter = DataExtracter(folder_path, folder_path, parser_backend=backend)
+
+        best_time = float("inf")
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            entries = [extracter.clean_data(json_file) for json_file in json_files]
+            best_time = min(best_time, time.perf_counter() - start_time)
+
+        if expected is None:
+            expected = entries
+        matches = entries == expected
+
+        results[backend] = len(json_files) / best_time if best_time > 0 else 0.0
+        print(
+            f"{backend:>9}: {results[backend]:10.1f} records/sec "
+            f"(best of {repeat}, identical output: {matches})"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    folder_path = input("Enter folder with Scopus records:\n").strip('"')
+    folder_path = folder_path.replace("\\", "/")
+
+    json_files = find_json_files(folder_path)
+    print(f"\nBenchmarking {len(json_files)} records")
+    benchmark_backends(folder_path, json_files)
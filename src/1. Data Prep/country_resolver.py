@@ -0,0 +1,105 @@
+import json
+import os
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pycountry
+from rapidfuzz import fuzz, process
+
+
+@lru_cache(maxsize=None)
+def valid_country_names():
+    """Build the list of candidate country names once per process."""
+    return tuple(country.name.lower() for country in pycountry.countries)
+
+
+class CountryResolver:
+    """Resolve raw country strings to pycountry names, caching every answer."""
+
+    def __init__(
+        self, score_cutoff=80, cache_size=100_000, cache_path=None, strict=False
+    ):
+        self.score_cutoff = score_cutoff
+        # Model.ipynb only accepts scores above the cutoff, not equal to it
+        self.strict = strict
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        # Raw string -> canonical name, oldest entries are dropped first
+        self.cache = OrderedDict()
+        # Names matched since the last clear, worker processes send only these back
+        self.new_matches = {}
+
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                self.cache.update(json.load(f))
+
+    def remember(self, country_name, match):
+        self.cache[country_name] = match
+        self.cache.move_to_end(country_name)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def match_names(self, country_names):
+        """Fuzzy match the cleaned names against every country in one batched pass."""
+        candidates = valid_country_names()
+        scores = process.cdist(
+            country_names,
+            candidates,
+            scorer=fuzz.WRatio,
+            score_cutoff=self.score_cutoff,
+            dtype=np.float64,
+            workers=-1,
+        )
+        # argmax takes the first best candidate, the same as process.extractOne
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(country_names)), best]
+        # cdist sets the scores below the cutoff to 0
+        if self.strict:
+            best_scores[best_scores <= self.score_cutoff] = 0
+        return [
+            candidates[index].title() if score > 0 else "Unknown"
+            for index, score in zip(best, best_scores)
+        ]
+
+    def resolve_many(self, country_names):
+        """Map every distinct raw country name to its standardized name."""
+        mapping = {}
+        missing = {}
+        for country_name in dict.fromkeys(country_names):
+            if country_name in self.cache:
+                mapping[country_name] = self.cache[country_name]
+                self.cache.move_to_end(country_name)
+                continue
+
+            cleaned_name = country_name.strip().lower()
+            if cleaned_name:
+                missing.setdefault(cleaned_name, []).append(country_name)
+            else:
+                mapping[country_name] = "Unknown"
+                self.new_matches[country_name] = "Unknown"
+
+        if missing:
+            cleaned_names = list(missing)
+            matches = self.match_names(cleaned_names)
+            for cleaned_name, match in zip(cleaned_names, matches):
+                for country_name in missing[cleaned_name]:
+                    mapping[country_name] = match
+                    self.new_matches[country_name] = match
+
+        for country_name, match in mapping.items():
+            self.remember(country_name, match)
+        return mapping
+
+    def resolve(self, country_name):
+        """Standardize a single country name."""
+        return self.resolve_many([country_name])[country_name]
+
+    def save_cache(self):
+        """Write the cached mappings so the next run can reuse them."""
+        if not self.cache_path:
+            return
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.cache, f, ensure_ascii=False)
+        os.replace(temp_path, self.cache_path)
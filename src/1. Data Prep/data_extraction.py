@@ -1,22 +1,47 @@
 import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from extraction_manifest import ExtractionManifest
+from record_parser import load_record, resolve_backend
 
 
 class DataExtracter:
-    def __init__(self, input_folder, output_folder):
+    def __init__(
+        self,
+        input_folder,
+        output_folder,
+        workers=1,
+        output_format="ndjson",
+        manifest_path=None,
+        parser_backend="auto",
+    ):
         self.input_folder = input_folder
         self.output_folder = output_folder
+        # Number of processes used to extract the files (1 means serial)
+        self.workers = max(1, workers or 1)
+        # "ndjson" writes one record per line, "json" writes a single JSON array
+        if output_format not in ("ndjson", "json"):
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.output_format = output_format
+        # With a manifest, reruns only extract new or changed files
+        self.manifest_path = manifest_path
+        # JSON parser used for the records ("auto", "simdjson", "orjson" or "json")
+        self.parser_backend = resolve_backend(parser_backend)
         # Ensure output folder exists
         os.makedirs(self.output_folder, exist_ok=True)
 
     def clean_data(self, json_file):
         """Clean data extracted from JSON file."""
+        extracted_data = None
         try:
-            with open(json_file, "r", encoding="utf-8") as file:
-                try:
-                    data = json.load(file).get("abstracts-retrieval-response", {})
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Invalid JSON format in file: {json_file}") from e
+            try:
+                data = load_record(json_file, self.parser_backend).get(
+                    "abstracts-retrieval-response", {}
+                )
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON format in file: {json_file}") from e
 
             # Extracting details based on the provided structure
             extracted_data = {
@@ -95,16 +120,18 @@ class DataExtracter:
             else:
                 extracted_data["Keywords"] = ["Not Available"]
 
-            # Clean duplicates and empty values
+            # Clean duplicates and empty values (dict keeps the order deterministic)
             extracted_data["Authors"] = list(
-                set(filter(None, extracted_data["Authors"]))
+                dict.fromkeys(filter(None, extracted_data["Authors"]))
             )
             extracted_data["Institution"] = list(
-                set(filter(None, extracted_data["Institution"]))
+                dict.fromkeys(filter(None, extracted_data["Institution"]))
+            )
+            extracted_data["City"] = list(
+                dict.fromkeys(filter(None, extracted_data["City"]))
             )
-            extracted_data["City"] = list(set(filter(None, extracted_data["City"])))
             extracted_data["Country"] = list(
-                set(filter(None, extracted_data["Country"]))
+                dict.fromkeys(filter(None, extracted_data["Country"]))
             )
 
             return extracted_data
@@ -118,24 +145,155 @@ class DataExtracter:
             print(f"Unexpected error processing file {json_file}: {e}")
             return extracted_data
 
-    def process_json_files(self):
-        """Process all JSON files in the input folder and save the cleaned data."""
-        cleaned_data = []
-        for year_folder in os.listdir(self.input_folder):
+    def extract_file(self, json_file):
+        """Extract one file, returning the entry, the worker's pid and time taken."""
+        start_time = time.perf_counter()
+        try:
+            cleaned_entry = self.clean_data(json_file)
+        except Exception as e:
+            # A bad file should never abort the whole run
+            print(f"Skipping file {json_file}: {e}")
+            cleaned_entry = None
+        return cleaned_entry, os.getpid(), time.perf_counter() - start_time
+
+    def list_year_files(self):
+        """List the JSON files inside each year folder of the input folder."""
+        year_files = []
+        for year_folder in sorted(os.listdir(self.input_folder)):
             year_path = os.path.join(self.input_folder, year_folder)
             if not os.path.isdir(year_path):
                 continue  # Skip non-folder items
 
-            for file_name in os.listdir(year_path):
-                if file_name.endswith(".json"):
-                    json_file = os.path.join(year_path, file_name)
-                    cleaned_entry = self.clean_data(json_file)
-                    if cleaned_entry:
-                        cleaned_data.append(cleaned_entry)
+            json_files = [
+                os.path.join(year_path, file_name)
+                for file_name in sorted(os.listdir(year_path))
+                if file_name.endswith(".json")
+            ]
+            year_files.append((year_folder, json_files))
+        return year_files
+
+    def print_worker_stats(self, worker_stats):
+        """Print the number of files and files/sec handled by each worker."""
+        for pid, (file_count, busy_time) in sorted(worker_stats.items()):
+            rate = file_count / busy_time if busy_time > 0 else 0.0
+            print(
+                f"Worker {pid}: {file_count} files in {busy_time:.2f} seconds "
+                f"({rate:.1f} files/sec)"
+            )
+
+    def count_worker_stats(self, results, worker_stats):
+        """Count the files and busy time of each worker while passing entries on."""
+        for cleaned_entry, pid, busy_time in results:
+            stats = worker_stats.setdefault(pid, [0, 0.0])
+            stats[0] += 1
+            stats[1] += busy_time
+            yield cleaned_entry
+
+    def extract_files(self, executor, json_files):
+        """Extract the files in order, using the process pool if there is one."""
+        if executor is None:
+            return map(self.extract_file, json_files)
+        # map() keeps the input order so the output matches the serial path
+        chunksize = max(1, len(json_files) // (self.workers * 4))
+        return executor.map(self.extract_file, json_files, chunksize=chunksize)
+
+    def save_year(self, entries, output_file):
+        """Stream the cleaned entries of one year into its output file."""
+        # Write to a temporary file first so a crash never leaves a half-written year
+        temp_file = output_file + ".tmp"
+        record_count = 0
+        with open(temp_file, "w", encoding="utf-8") as f:
+            if self.output_format == "json":
+                f.write("[")
+
+            for cleaned_entry in entries:
+                if not cleaned_entry:
+                    continue
+
+                if self.output_format == "ndjson":
+                    f.write(json.dumps(cleaned_entry, ensure_ascii=False) + "\n")
+                else:
+                    f.write(",\n" if record_count else "\n")
+                    f.write(json.dumps(cleaned_entry, ensure_ascii=False, indent=4))
+                record_count += 1
 
-            # Save the cleaned data for the current year as a JSON file
-            output_file = os.path.join(self.output_folder, f"{year_folder}.json")
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(cleaned_data, f, indent=4, ensure_ascii=False)
+            if self.output_format == "json":
+                f.write("\n]\n")
+
+        os.replace(temp_file, output_file)
+        return record_count
+
+    def update_year(
+        self, manifest, executor, year_folder, json_files, output_file, worker_stats
+    ):
+        """Extract only the new or changed files of a year into the manifest.
+
+        The changes are committed by the caller once the year file is written.
+        """
+        changed_files, removed_count = manifest.changed_files(year_folder, json_files)
+        if not changed_files and not removed_count and os.path.exists(output_file):
+            manifest.commit()
+            return False
+
+        results = self.extract_files(executor, changed_files)
+        entries = self.count_worker_stats(results, worker_stats)
+        for json_file, cleaned_entry in zip(changed_files, entries):
+            manifest.store(year_folder, json_file, cleaned_entry)
+
+        print(
+            f"{year_folder}: {len(changed_files)} new or changed files, "
+            f"{removed_count} removed"
+        )
+        return True
+
+    def process_json_files(self):
+        """Process all JSON files in the input folder and save the cleaned data."""
+        worker_stats = {}
+        executor = None
+        manifest = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+        if self.manifest_path:
+            manifest = ExtractionManifest(self.manifest_path, self.input_folder)
+
+        try:
+            for year_folder, json_files in self.list_year_files():
+                output_file = os.path.join(
+                    self.output_folder, f"{year_folder}.{self.output_format}"
+                )
+
+                if manifest is not None:
+                    if not self.update_year(
+                        manifest,
+                        executor,
+                        year_folder,
+                        json_files,
+                        output_file,
+                        worker_stats,
+                    ):
+                        print(f"{year_folder} is up to date, skipping")
+                        continue
+                    # Rebuild the year from the cached records of the manifest
+                    entries = manifest.records(year_folder)
+                else:
+                    results = self.extract_files(executor, json_files)
+                    entries = self.count_worker_stats(results, worker_stats)
+
+                # Save the cleaned data for the current year while it is being parsed
+                record_count = self.save_year(entries, output_file)
+                if manifest is not None:
+                    # Only now does the year file match the manifest, after a crash
+                    # before this the next run extracts the changed files again
+                    manifest.commit()
+
+                print(
+                    f"Saved {record_count} cleaned records for {year_folder} "
+                    f"to {output_file}"
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if manifest is not None:
+                manifest.close()
 
-            print(f"Saved cleaned data for {year_folder} to {output_file}")
+        self.print_worker_stats(worker_stats)
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+
+class ExtractionManifest:
+    """Remember every extracted input file so reruns only parse new or changed files."""
+
+    def __init__(self, manifest_path, input_folder):
+        self.manifest_path = manifest_path
+        self.input_folder = input_folder
+        # Signatures of the files found to be new or changed, waiting to be stored
+        self.pending = {}
+
+        self.connection = sqlite3.connect(manifest_path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                year TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                record TEXT
+            )
+            """
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS files_year ON files(year)")
+        self.connection.commit()
+
+    def relative_path(self, json_file):
+        """Key files by their path inside the input folder."""
+        return os.path.relpath(json_file, self.input_folder).replace("\\", "/")
+
+    def file_hash(self, json_file):
+        """Hash the content of a file without loading it all at once."""
+        digest = hashlib.blake2b(digest_size=20)
+        with open(json_file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def changed_files(self, year, json_files):
+        """Return the files of a year that need extracting and how many were removed."""
+        known = {
+            path: (size, mtime, file_hash)
+            for path, size, mtime, file_hash in self.connection.execute(
+                "SELECT path, size, mtime, hash FROM files WHERE year = ?", (year,)
+            )
+        }
+
+        changed = []
+        for json_file in json_files:
+            path = self.relative_path(json_file)
+            stat = os.stat(json_file)
+            signature = known.pop(path, None)
+            if signature and signature[:2] == (stat.st_size, stat.st_mtime_ns):
+                continue  # Same size and mtime, so the cached record is still valid
+
+            file_hash = self.file_hash(json_file)
+            if signature and signature[2] == file_hash:
+                # Only touched, refresh the mtime without re-extracting
+                self.connection.execute(
+                    "UPDATE files SET size = ?, mtime = ? WHERE path = ?",
+                    (stat.st_size, stat.st_mtime_ns, path),
+                )
+                continue
+
+            self.pending[path] = (stat.st_size, stat.st_mtime_ns, file_hash)
+            changed.append(json_file)
+
+        # Whatever is left in the manifest was deleted from the input folder
+        self.connection.executemany(
+            "DELETE FROM files WHERE path = ?", [(path,) for path in known]
+        )
+        return changed, len(known)
+
+    def store(self, year, json_file, cleaned_entry):
+        """Save the extracted record of a file (None for files that failed)."""
+        path = self.relative_path(json_file)
+        size, mtime, file_hash = self.pending.pop(path)
+        record = (
+            json.dumps(cleaned_entry, ensure_ascii=False) if cleaned_entry else None
+        )
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files (path, year, size, mtime, hash, record) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (path, year, size, mtime, file_hash, record),
+        )
+
+    def records(self, year):
+        """Yield the cached records of a year in the same order as the input files."""
+        cursor = self.connection.execute(
+            "SELECT record FROM files WHERE year = ? AND record IS NOT NULL "
+            "ORDER BY path",
+            (year,),
+        )
+        for (record,) in cursor:
+            yield json.loads(record)
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        # Changes that were not committed belong to a year file that was never written
+        self.connection.close()
@@ -1,18 +1,103 @@
 import glob
 import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 import numpy as np
 import pandas as pd
-import pycountry
-from rapidfuzz import process
 from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+from country_resolver import CountryResolver
+from record_store import RecordStore
+from row_splitter import SPLIT_COLUMNS, split_rows
+from stage_timer import StageTimer
+from table_io import write_table
+
+# The fields kept from each record, in the column order of the DataFrame
+EXTRACTED_COLUMNS = [
+    "Title",
+    "Authors",
+    "Institution",
+    "City",
+    "Country",
+    "Keywords",
+    "Date",
+]
+
+# Author/institution pairs of every input file, set in each worker by run()
+_global_author_index = None
+
+
+# The imputer of each worker process, so the tasks only send file paths
+_worker_imputer = None
+
+
+def _set_global_author_index(author_to_institution):
+    global _global_author_index
+    _global_author_index = author_to_institution
+
+
+def _init_worker(output_format, country_cache, author_to_institution, sample_rss=False):
+    """Build the worker's imputer once, with only the state the tasks need."""
+    global _worker_imputer
+    _set_global_author_index(author_to_institution)
+    _worker_imputer = ImputeMissingValue(
+        output_format=output_format, sample_rss=sample_rss
+    )
+    _worker_imputer.country_resolver.cache.update(country_cache)
+
+
+def _index_file(file_path):
+    return _worker_imputer.index_file(file_path)
+
+
+def _process_file(file_path, output_folder):
+    return _worker_imputer.process_file(file_path, output_folder)
 
 
 class ImputeMissingValue:
+    def __init__(
+        self,
+        country_cache_path=None,
+        output_format="csv",
+        workers=1,
+        global_author_index=False,
+        sample_rss=False,
+    ):
+        # Shared with Model.ipynb, resolves each distinct country name only once
+        self.country_resolver = CountryResolver(cache_path=country_cache_path)
+        # "parquet" keeps the list and categorical columns typed, "csv" stores reprs
+        if output_format not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.output_format = output_format
+        # Number of processes used to impute the files (1 means serial)
+        self.workers = max(1, workers or 1)
+        # Impute institutions from the authors of every file, not only the same file
+        self.global_author_index = global_author_index
+        # Also sample the peak RSS of each step of process_file, for the benchmark
+        self.sample_rss = sample_rss
+
+    def iter_ndjson(self, file_path):
+        """Yield the records of an NDJSON file one line at a time."""
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                for line_number, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        print(f"Skipping line {line_number} of {file_path}: {e}")
+        except OSError as e:
+            print(f"Error loading file {file_path}: {e}")
+
     def load_json(self, file_path):
-        """Load the JSON file."""
+        """Load the JSON file (NDJSON files are streamed record by record)."""
+        if file_path.endswith(".ndjson"):
+            return self.iter_ndjson(file_path)
         try:
             with open(file_path, "r", encoding="utf-8") as f:
                 return json.load(f)
@@ -22,20 +107,16 @@ class ImputeMissingValue:
 
     def extract_data(self, data):
         """Extract relevant fields from the raw JSON data."""
-        extracted_data = []
-        for entry in data:
-            extracted_data.append(
-                {
-                    "Title": entry.get("Title", None),
-                    "Authors": entry.get("Authors", None),
-                    "Institution": entry.get("Institution", None),
-                    "City": entry.get("City", None),
-                    "Country": entry.get("Country", None),
-                    "Keywords": entry.get("Keywords", None),
-                    "Date": entry.get("Date", None),
-                }
-            )
-        return pd.DataFrame(extracted_data)
+        # The store keeps each repeated author, institution, city, country and
+        # keyword as one shared string instead of a copy per paper
+        store = RecordStore()
+        for column in EXTRACTED_COLUMNS:
+            store.add_field(column)
+        store.extend(
+            {column: entry.get(column) for column in EXTRACTED_COLUMNS}
+            for entry in data
+        )
+        return store.to_dataframe(EXTRACTED_COLUMNS)
 
     def clean_institution_names(self, df):
         """Clean institution names, remove 'not available' and NaNs."""
@@ -54,73 +135,121 @@ class ImputeMissingValue:
         return df
 
     def create_author_to_institution_mapping(self, df):
-        """Create a mapping of authors to their known institutions."""
-        author_to_institution = {}
-        for _, row in df.iterrows():
-            if isinstance(row["Authors"], list) and isinstance(
-                row["Institution"], list
-            ):
-                for author in row["Authors"]:
-                    author_to_institution.setdefault(author, set()).update(
-                        row["Institution"]
-                    )
+        """Create a table of every author and one of their known institutions."""
+        known = df["Authors"].map(type).eq(list) & df["Institution"].map(type).eq(list)
+        author_to_institution = (
+            df.loc[known, ["Authors", "Institution"]]
+            .explode("Authors")
+            .explode("Institution")
+            .dropna()
+            .drop_duplicates()
+            .reset_index(drop=True)
+        )
         return author_to_institution
 
-    def impute_institution(self, row, author_to_institution, most_common_institution):
-        """Impute missing institutions for authors."""
-        if not isinstance(row["Institution"], list) or len(row["Institution"]) == 0:
-            institutions = set()
-            if isinstance(row["Authors"], list):
-                for author in row["Authors"]:
-                    if author in author_to_institution:
-                        institutions.update(author_to_institution[author])
-            if institutions:
-                return list(institutions)
-            return [most_common_institution]
-        return row["Institution"]
-
-    def clean_keywords(self, df):
+    def find_most_common_institution(self, df):
+        """Find the most common known institution, used when nothing else is known."""
+        is_list = df["Institution"].map(type).eq(list)
+        all_institutions = df.loc[is_list, "Institution"].explode().dropna()
+        return all_institutions.mode()[0] if not all_institutions.empty else "Unknown"
+
+    def find_missing_institutions(self, df):
+        """Find the positions of the papers without any institution."""
+        is_list = df["Institution"].map(type).eq(list)
+        has_institution = pd.Series(False, index=df.index)
+        has_institution[is_list] = df.loc[is_list, "Institution"].map(len) > 0
+        return np.flatnonzero(~has_institution.to_numpy())
+
+    def find_author_institutions(self, df, missing, author_to_institution):
+        """Map each missing paper to the known institutions of its authors."""
+        # Join the authors of the papers missing an institution to the known ones
+        paper_authors = pd.DataFrame(
+            {"Paper": missing, "Authors": df["Authors"].iloc[missing].to_numpy()}
+        )
+        paper_authors = paper_authors[paper_authors["Authors"].map(type).eq(list)]
+        return (
+            paper_authors.explode("Authors")
+            .dropna()
+            .merge(author_to_institution, on="Authors")
+            .drop_duplicates(subset=["Paper", "Institution"])
+            .sort_values(["Paper", "Institution"])
+            .groupby("Paper")["Institution"]
+            .agg(list)
+            .to_dict()
+        )
+
+    def impute_institution(
+        self, df, author_to_institution, most_common_institution, stats=None
+    ):
+        """Impute missing institutions from the other papers of the same authors."""
+        missing = self.find_missing_institutions(df)
+        imputed = {}
+        if len(missing) > 0:
+            imputed = self.find_author_institutions(df, missing, author_to_institution)
+
+            # Papers whose authors have no known institution get the most common one
+            institutions = df["Institution"].tolist()
+            for paper in missing:
+                institutions[paper] = imputed.get(paper, [most_common_institution])
+            df["Institution"] = institutions
+
+        if stats is not None:
+            stats["missing"] = len(missing)
+            stats["imputed"] = len(imputed)
+        return df
+
+    def clean_keywords(self, df, chunk_elements=2**22):
         """Clean and impute missing keywords."""
         vectorizer = CountVectorizer(stop_words="english", max_features=100)
         title_vectors = vectorizer.fit_transform(df["Title"].fillna("No Title"))
-        similarity_matrix = cosine_similarity(title_vectors)
+        # With unit length rows, the dot product is the cosine similarity
+        title_vectors = normalize(title_vectors).tocsr()
 
         df["Keywords"] = df["Keywords"].apply(
             lambda x: [kw for kw in x if pd.notna(kw)] if isinstance(x, list) else x
         )
-        df["Keywords"] = df.apply(
-            lambda row: self.infer_keywords(row, df, similarity_matrix), axis=1
+        df["Keywords"] = self.infer_keywords(
+            df["Keywords"].tolist(), title_vectors, chunk_elements
         )
 
         return df
 
-    def infer_keywords(self, row, df, similarity_matrix):
+    def infer_keywords(self, keywords, title_vectors, chunk_elements):
         """Infer missing keywords based on the cosine similarity of titles."""
-        keywords = row["Keywords"]
+        has_keywords = np.array(
+            [isinstance(kw, list) and len(kw) > 0 for kw in keywords], dtype=bool
+        )
+        missing = np.flatnonzero(~has_keywords)
+        candidates = np.flatnonzero(has_keywords)
+        if len(missing) == 0:
+            return keywords
 
-        # Check if the 'Keywords' column is not empty
-        if keywords and len(keywords) > 0:
+        # If no rows have keywords, infer based on the most common keywords
+        if len(candidates) == 0:
+            all_keywords = [
+                kw
+                for sublist in keywords
+                if isinstance(sublist, list)
+                for kw in sublist
+            ]
+            most_common_keywords = pd.Series(all_keywords).mode().tolist()
+            for row in missing:
+                keywords[row] = list(most_common_keywords)
             return keywords
 
-        # If no keywords are available for the current row, find the most similar rows
-        similar_indices = similarity_matrix[row.name].argsort()[
-            ::-1
-        ]  # row.name gives the index
-        for idx in similar_indices:
-            similar_keywords = df.loc[idx, "Keywords"]
-            if similar_keywords and len(similar_keywords) > 0:
-                return similar_keywords
-
-        # If no similar rows with keywords, infer based on the most common keywords
-        all_keywords = [
-            kw
-            for sublist in df["Keywords"]
-            if isinstance(sublist, list)
-            for kw in sublist
-        ]
-        return (
-            pd.Series(all_keywords).mode().tolist()
-        )  # Return the most common keywords
+        # The first similar row with keywords is the most similar candidate, so
+        # only rows missing keywords are compared (a chunk at a time) to candidates
+        candidate_vectors = title_vectors[candidates].T.tocsc()
+        chunk_size = max(1, chunk_elements // len(candidates))
+        for start in range(0, len(missing), chunk_size):
+            rows = missing[start : start + chunk_size]
+            similarity = (title_vectors[rows] @ candidate_vectors).toarray()
+            # Ties go to the later row so the result is deterministic
+            best = len(candidates) - 1 - similarity[:, ::-1].argmax(axis=1)
+            for row, candidate in zip(rows, candidates[best]):
+                keywords[row] = keywords[candidate]
+
+        return keywords
 
     def clean_location(self, df, column_name):
         """Clean city and country columns."""
@@ -142,6 +271,10 @@ class ImputeMissingValue:
         """Save the cleaned DataFrame to a CSV file."""
         df.to_csv(file_path, index=False)
 
+    def save_table(self, df, file_path):
+        """Save the cleaned DataFrame as CSV or Parquet, based on the file extension."""
+        write_table(df, file_path)
+
     def impute_missing_dates(self, df):
         """Impute missing dates with the most common date."""
         most_common_date = (
@@ -152,45 +285,19 @@ class ImputeMissingValue:
 
     def clean_country(self, country_name):
         """Clean and standardize country names."""
-        country_name = country_name.strip().lower()
-        valid_country_names = [country.name.lower() for country in pycountry.countries]
-        if country_name:
-            match = process.extractOne(
-                country_name, valid_country_names, score_cutoff=80
-            )
-            return match[0].title() if match else "Unknown"
-        return "Unknown"
+        return self.country_resolver.resolve(country_name)
 
     def expand_and_clean_location(self, df):
         """Clean, expand, and standardize country and institution columns."""
-
-        # Function to ensure the value is a string
-        def safe_str(x):
-            if isinstance(x, list):
-                return ", ".join(str(item) for item in x)
-            elif pd.notna(x):
-                return str(x)
-            return ""
-
-        # Apply safe_str function to ensure all values in 'Country' and 'Institution' columns are strings
-        df["Country"] = df["Country"].apply(safe_str)
-        df["Institution"] = df["Institution"].apply(safe_str)
-
-        # Clean the 'Country' and 'Institution' columns
-        df["Country"] = df["Country"].str.replace(r"[\[\]']", "", regex=True)
-        df["Institution"] = df["Institution"].str.replace(r"[\[\]']", "", regex=True)
-
-        # Expand rows for 'Country' and 'Institution' in one pass
-        df = (
-            df.assign(Country=df["Country"].str.split(", "))
-            .assign(Institution=lambda x: x["Institution"].str.split(", "))
-            .explode("Country")
-            .explode("Institution")
-            .drop_duplicates(subset=["Title", "Institution"])
-        )
-
-        # Clean and filter the 'Country' column
-        df["Country"] = df["Country"].apply(self.clean_country)
+        # One row per country and institution, the same splitter Model.ipynb uses
+        df = split_rows(df, SPLIT_COLUMNS, strip=r"[\[\]']")
+        # Missing values become empty strings, and their rows "Unknown" countries
+        df[list(SPLIT_COLUMNS)] = df[list(SPLIT_COLUMNS)].fillna("")
+        df = df.drop_duplicates(subset=["Title", "Institution"])
+
+        # Clean and filter the 'Country' column, matching each distinct name once
+        country_mapping = self.country_resolver.resolve_many(df["Country"])
+        df["Country"] = df["Country"].map(country_mapping)
         df = df[df["Country"] != "Unknown"]
 
         # Reset index
@@ -198,70 +305,202 @@ class ImputeMissingValue:
 
         return df
 
-    def run(self, folder_path, output_folder):
-        """Main method to process and clean all JSON files in a directory."""
-        if not os.path.isdir(folder_path):
-            print(f"The folder '{folder_path}' does not exist.")
-            return
-
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
-
-        json_files = glob.glob(os.path.join(folder_path, "*.json"))
-
-        if not json_files:
-            print(f"No .json files found in the folder '{folder_path}'.")
-            return
-
-        for file_path in json_files:
-            print(f"Processing file: {file_path}")
-
+    def index_file(self, file_path):
+        """List the author/institution pairs known in one file."""
+        try:
             data = self.load_json(file_path)
             if data is None:
-                continue
+                return None
+            df = self.clean_institution_names(self.extract_data(data))
+            return self.create_author_to_institution_mapping(df)
+        except Exception as e:
+            print(f"Error indexing file {file_path}: {e}")
+            return None
 
-            df = self.extract_data(data)
+    def build_author_index(self, json_files):
+        """Combine the author/institution pairs of every file, in parallel."""
+        if self.workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.output_format, {}, None),
+            ) as executor:
+                indexes = list(executor.map(_index_file, json_files))
+        else:
+            indexes = [self.index_file(file_path) for file_path in json_files]
+
+        indexes = [index for index in indexes if index is not None]
+        if not indexes:
+            return pd.DataFrame(columns=["Authors", "Institution"])
+        return pd.concat(indexes, ignore_index=True).drop_duplicates(ignore_index=True)
+
+    def process_file(self, file_path, output_folder):
+        """Clean, impute and save one file, returning its statistics.
+
+        stats["stages"] has the time, records and peak RSS of each step.
+        """
+        start_time = time.perf_counter()
+        print(f"Processing file: {file_path}")
+        self.country_resolver.new_matches.clear()
+        timer = StageTimer(sample_rss=self.sample_rss)
+        stats = {"file": file_path}
+        try:
+            with timer.stage("load"):
+                data = self.load_json(file_path)
+                if data is None:
+                    return None
+                df = self.extract_data(data)
+            records = len(df)
+            timer.stages["load"]["records"] = records
+            stats["records"] = records
 
             # Clean institution names and create author-to-institution mapping
-            df = self.clean_institution_names(df)
-            author_to_institution = self.create_author_to_institution_mapping(df)
-
-            all_institutions = [
-                inst
-                for sublist in df["Institution"]
-                for inst in sublist
-                if isinstance(sublist, list)
-            ]
-            most_common_institution = (
-                pd.Series(all_institutions).mode()[0] if all_institutions else "Unknown"
-            )
-
-            df = self.impute_missing_dates(df)
-
-            # Impute missing institutions
-            df["Institution"] = df.apply(
-                lambda row: self.impute_institution(
-                    row, author_to_institution, most_common_institution
-                ),
-                axis=1,
-            )
+            with timer.stage("clean_institution_names", records):
+                df = self.clean_institution_names(df)
+            with timer.stage("author_mapping", records):
+                author_to_institution = self.create_author_to_institution_mapping(df)
+                most_common_institution = self.find_most_common_institution(df)
+
+            with timer.stage("dates", records):
+                df = self.impute_missing_dates(df)
+
+            # Impute missing institutions, from every file with the global index
+            with timer.stage("institution", records):
+                if _global_author_index is not None:
+                    missing = self.find_missing_institutions(df)
+                    stats["local_imputed"] = len(
+                        self.find_author_institutions(
+                            df, missing, author_to_institution
+                        )
+                    )
+                    author_to_institution = _global_author_index
+                df = self.impute_institution(
+                    df, author_to_institution, most_common_institution, stats
+                )
 
             # Clean and impute missing keywords
-            df = self.clean_keywords(df)
+            with timer.stage("keywords", records):
+                df = self.clean_keywords(df)
 
             # Clean city and country columns
-            df = self.clean_location(df, "City")
-            df = self.clean_location(df, "Country")
+            with timer.stage("location", records):
+                df = self.clean_location(df, "City")
+                df = self.clean_location(df, "Country")
 
             # Expand and clean 'Country' and 'Institution'
-            df = self.expand_and_clean_location(df)
+            with timer.stage("expand_location", records):
+                df = self.expand_and_clean_location(df)
 
             output_file_name = (
-                os.path.splitext(os.path.basename(file_path))[0] + "_cleaned.csv"
+                os.path.splitext(os.path.basename(file_path))[0]
+                + f"_cleaned.{self.output_format}"
             )
             output_file_path = os.path.join(output_folder, output_file_name)
 
-            self.save_to_csv(df, output_file_path)
+            with timer.stage("save", records):
+                self.save_table(df, output_file_path)
             print(f"Cleaned data is saved\n")
+        except Exception as e:
+            # One bad file should not stop the others
+            print(f"Error processing file {file_path}: {e}")
+            return None
 
+        stats["seconds"] = time.perf_counter() - start_time
+        stats["stages"] = timer.stages
+        # Send the new country matches back so the main process can save them
+        stats["country_cache"] = dict(self.country_resolver.new_matches)
+        return stats
+
+    def print_imputation_report(self, file_stats, index_time, impute_time):
+        """Print how busy the process pool was and the institution coverage."""
+        # Seconds spent in process_file per second of wall time. It is not a speedup
+        # over one worker, which would need a workers=1 run to compare against
+        busy_time = sum(stats["seconds"] for stats in file_stats)
+        busy_ratio = busy_time / impute_time if impute_time > 0 else 0.0
+        print(
+            f"Imputed {len(file_stats)} files in {impute_time:.2f} seconds "
+            f"({busy_time:.2f} seconds of work, busy ratio {busy_ratio:.1f} "
+            f"with {self.workers} workers, "
+            f"{busy_ratio / self.workers:.0%} parallel efficiency)"
+        )
+
+        missing = sum(stats["missing"] for stats in file_stats)
+        imputed = sum(stats["imputed"] for stats in file_stats)
+        if self.global_author_index:
+            local_imputed = sum(stats["local_imputed"] for stats in file_stats)
+            print(f"Global author index built in {index_time:.2f} seconds")
+            print(
+                f"Papers without an institution: {missing}, imputed from authors: "
+                f"{local_imputed} per file -> {imputed} with the global index"
+            )
+        else:
+            print(
+                f"Papers without an institution: {missing}, "
+                f"imputed from authors: {imputed}"
+            )
+
+    def run(self, folder_path, output_folder):
+        """Main method to process and clean all JSON files in a directory.
+
+        Returns the statistics of every file that was processed.
+        """
+        if not os.path.isdir(folder_path):
+            print(f"The folder '{folder_path}' does not exist.")
+            return
+
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+
+        json_files = sorted(
+            glob.glob(os.path.join(folder_path, "*.json"))
+            + glob.glob(os.path.join(folder_path, "*.ndjson"))
+        )
+
+        if not json_files:
+            print(f"No .json or .ndjson files found in the folder '{folder_path}'.")
+            return
+
+        # Phase one: index the authors and institutions of every file
+        start_time = time.perf_counter()
+        author_index = None
+        if self.global_author_index:
+            author_index = self.build_author_index(json_files)
+            print(f"Global author index: {len(author_index)} author/institution pairs")
+        index_time = time.perf_counter() - start_time
+
+        # Phase two: impute every file against that index
+        start_time = time.perf_counter()
+        try:
+            if self.workers > 1:
+                with ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(
+                        self.output_format,
+                        dict(self.country_resolver.cache),
+                        author_index,
+                        self.sample_rss,
+                    ),
+                ) as executor:
+                    results = list(
+                        executor.map(_process_file, json_files, repeat(output_folder))
+                    )
+            else:
+                _set_global_author_index(author_index)
+                results = [
+                    self.process_file(file_path, output_folder)
+                    for file_path in json_files
+                ]
+        finally:
+            _set_global_author_index(None)
+        impute_time = time.perf_counter() - start_time
+
+        file_stats = [stats for stats in results if stats is not None]
+        for stats in file_stats:
+            for country_name, match in stats.pop("country_cache").items():
+                self.country_resolver.remember(country_name, match)
+        self.print_imputation_report(file_stats, index_time, impute_time)
+
+        self.country_resolver.save_cache()
         print(f"All files processed and saved in: {output_folder}")
+        return file_stats
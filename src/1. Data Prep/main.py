@@ -1,3 +1,4 @@
+import os
 import time
 
 from change_extension import ChangeExtension
@@ -10,14 +11,26 @@ def change_the_extensions(root_directory):
     ce.change_extension(root_directory)
 
 
-def extract_data(input_folder, output_folder):
+def extract_data(input_folder, output_folder, workers=os.cpu_count()):
     change_the_extensions(input_folder)
-    processor = DataExtracter(input_folder, output_folder)
+    # The manifest lets reruns only extract the files that are new or changed
+    manifest_path = os.path.join(output_folder, "extraction_manifest.sqlite")
+    processor = DataExtracter(
+        input_folder, output_folder, workers=workers, manifest_path=manifest_path
+    )
     processor.process_json_files()
 
 
-def impute_values(folder_path, output_folder):
-    imputer = ImputeMissingValue()
+def impute_values(folder_path, output_folder, workers=os.cpu_count()):
+    # Country matches are kept between runs, most raw names repeat every time
+    country_cache_path = os.path.join(output_folder, "country_cache.json")
+    # Index the authors of every file first, then impute the files in a process pool
+    imputer = ImputeMissingValue(
+        country_cache_path=country_cache_path,
+        output_format="parquet",
+        workers=workers,
+        global_author_index=True,
+    )
     imputer.run(folder_path, output_folder)
 
 
@@ -39,10 +52,12 @@ def run():
     impute_values(extracted_folder, imputed_folder)
 
 
-start_time = time.time()
+# Guard the entry point so the extraction worker processes don't re-run it
+if __name__ == "__main__":
+    start_time = time.time()
 
-run()
+    run()
 
-end_time = time.time()
-elapsed_time = end_time - start_time
-print(f"\nTime taken: {elapsed_time:.2f} seconds")
+    end_time = time.time()
+    elapsed_time = end_time - start_time
+    print(f"\nTime taken: {elapsed_time:.2f} seconds")
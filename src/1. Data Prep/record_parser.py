@@ -0,0 +1,85 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+RESPONSE_KEY = "abstracts-retrieval-response"
+# The only parts of a record that DataExtracter.clean_data uses
+NEEDED_FIELDS = ("coredata", "authors", "affiliation", "authkeywords")
+# Fastest first, "auto" picks the first one that is installed
+BACKENDS = ("simdjson", "orjson", "json")
+
+# simdjson parsers are reused, but can't be shared between processes
+_simdjson_parser = None
+
+
+def available_backends():
+    """List the parser backends that can be used in this environment."""
+    installed = {"simdjson": simdjson, "orjson": orjson, "json": json}
+    return [backend for backend in BACKENDS if installed[backend] is not None]
+
+
+def resolve_backend(backend="auto"):
+    """Turn a backend name into one that is installed, falling back to json."""
+    if backend == "auto":
+        return available_backends()[0]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown JSON parser backend: {backend}")
+    if backend not in available_backends():
+        print(f"JSON parser backend '{backend}' is not installed, using json")
+        return "json"
+    return backend
+
+
+def _materialise(value):
+    """Turn a lazy simdjson value into plain Python objects."""
+    if isinstance(value, simdjson.Object):
+        return value.as_dict()
+    if isinstance(value, simdjson.Array):
+        return value.as_list()
+    return value
+
+
+def _parse_simdjson(raw):
+    """Parse a record, only materialising the fields that are used."""
+    global _simdjson_parser
+    if _simdjson_parser is None:
+        _simdjson_parser = simdjson.Parser()
+
+    document = _simdjson_parser.parse(raw)
+    if isinstance(document, simdjson.Object):
+        response = document.get(RESPONSE_KEY)
+        if isinstance(response, simdjson.Object):
+            return {
+                RESPONSE_KEY: {
+                    field: _materialise(response[field])
+                    for field in NEEDED_FIELDS
+                    if field in response
+                }
+            }
+    # Anything unusual is materialised whole so it behaves exactly like json
+    return _materialise(document)
+
+
+def load_record(json_file, backend="json"):
+    """Load a Scopus record with the given backend, raising ValueError if invalid."""
+    if backend == "json":
+        with open(json_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    with open(json_file, "rb") as file:
+        raw = file.read()
+    try:
+        if backend == "simdjson":
+            return _parse_simdjson(raw)
+        return orjson.loads(raw)
+    except Exception:
+        # The fast parsers reject a few things json accepts (NaN, huge ints, ...)
+        return json.loads(raw.decode("utf-8"))
@@ -0,0 +1,184 @@
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from table_io import LIST_COLUMNS
+
+# Fields that are nearly unique per paper, interning them would only cost memory
+UNIQUE_FIELDS = ("Title", "Previous File")
+
+
+def is_missing(value):
+    """None and NaN are missing, code -1 like a missing pandas category."""
+    return value is None or (type(value) is float and value != value)
+
+
+class StringDictionary:
+    """Interned values and their integer codes, the categories of a column."""
+
+    def __init__(self, values=()):
+        self.codes = {}
+        self.values = []
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value):
+        """The code of a string, only strings are interned."""
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class RecordStore:
+    """Records kept as integer codes into one shared dictionary per field.
+
+    Only strings are interned. Other values, like numbers, booleans or nested
+    lists, are kept as they are so they decode unchanged.
+    """
+
+    def __init__(self, dictionaries=None):
+        # Pass the dictionaries of another store to give both the same codes
+        self.dictionaries = dictionaries if dictionaries is not None else {}
+        self.fields = []
+        self.rows = 0
+        # Unique fields are plain lists, the others are arrays of codes
+        self.unique = {}
+        self.scalar_codes = {}
+        # List fields are flat code arrays, row i holds codes[offsets[i]:offsets[i + 1]]
+        self.list_codes = {}
+        self.list_offsets = {}
+        self.list_nulls = {}
+        # The rare values that cannot be codes, by field and row
+        self.other = {}
+
+    def dictionary(self, field):
+        if field not in self.dictionaries:
+            self.dictionaries[field] = StringDictionary()
+        return self.dictionaries[field]
+
+    def add_field(self, field, is_list=None):
+        """Start storing a field, earlier records get None for it."""
+        if is_list is None:
+            is_list = field in LIST_COLUMNS
+        self.fields.append(field)
+        if field in UNIQUE_FIELDS:
+            self.unique[field] = [None] * self.rows
+        elif is_list:
+            self.list_codes[field] = array("i")
+            self.list_offsets[field] = array("q", [0] * (self.rows + 1))
+            self.list_nulls[field] = bytearray(b"\x01" * self.rows)
+            self.other[field] = {}
+        else:
+            self.scalar_codes[field] = array("i", [-1] * self.rows)
+            self.other[field] = {}
+
+    def extend(self, records, batch_size=10_000):
+        """Add records a batch at a time, encoding one field of the batch at once."""
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == batch_size:
+                self.append_batch(batch)
+                batch = []
+        if batch:
+            self.append_batch(batch)
+        return self
+
+    def append_batch(self, records):
+        known = set(self.fields)
+        for record in records:
+            if not known.issuperset(record):
+                for field, value in record.items():
+                    if field not in known:
+                        self.add_field(
+                            field,
+                            isinstance(value, list) if value is not None else None,
+                        )
+                        known.add(field)
+
+        for field in self.fields:
+            column = [record.get(field) for record in records]
+            if field in self.unique:
+                self.unique[field].extend(column)
+                continue
+
+            dictionary = self.dictionary(field)
+            lookup = dictionary.codes
+            if field in self.scalar_codes:
+                codes = self.scalar_codes[field]
+                for row, value in enumerate(column, start=self.rows):
+                    if type(value) is str:
+                        code = lookup.get(value)
+                        codes.append(
+                            code if code is not None else dictionary.encode(value)
+                        )
+                    else:
+                        if not is_missing(value):
+                            self.other[field][row] = value
+                        codes.append(-1)
+                continue
+
+            codes = self.list_codes[field]
+            offsets = self.list_offsets[field]
+            nulls = self.list_nulls[field]
+            for row, value in enumerate(column, start=self.rows):
+                if isinstance(value, list) and all(
+                    type(item) is str or is_missing(item) for item in value
+                ):
+                    try:
+                        # Most items are already known, a plain lookup is the fast path
+                        codes.extend([lookup[item] for item in value])
+                    except KeyError:
+                        codes.extend(
+                            [
+                                -1 if is_missing(item) else dictionary.encode(item)
+                                for item in value
+                            ]
+                        )
+                    nulls.append(0)
+                else:
+                    if value is not None:
+                        self.other[field][row] = value
+                    nulls.append(1)
+                offsets.append(len(codes))
+        self.rows += len(records)
+
+    def __len__(self):
+        return self.rows
+
+    def to_dataframe(self, columns=None):
+        """Build a DataFrame whose list items are the shared interned strings."""
+        columns = columns or self.fields
+        data = {}
+        for field in columns:
+            if field not in self.fields:
+                data[field] = [None] * self.rows
+            elif field in self.unique:
+                data[field] = self.unique[field]
+            elif field in self.scalar_codes:
+                # The extra None at the end is what code -1 picks
+                values = np.array(self.dictionary(field).values + [None], dtype=object)
+                column = values[np.frombuffer(self.scalar_codes[field], np.int32)]
+                for row, value in self.other[field].items():
+                    column[row] = value
+                data[field] = column
+            else:
+                data[field] = self.decode_lists(field)
+        return pd.DataFrame(data, columns=columns)
+
+    def decode_lists(self, field):
+        """Decode a whole list field at once, not row by row."""
+        values = np.array(self.dictionary(field).values + [None], dtype=object)
+        items = values[np.frombuffer(self.list_codes[field], np.int32)].tolist()
+        offsets = self.list_offsets[field]
+        lists = [items[offsets[row] : offsets[row + 1]] for row in range(self.rows)]
+        for row, is_null in enumerate(self.list_nulls[field]):
+            if is_null:
+                lists[row] = self.other[field].get(row)
+        return lists
@@ -1,24 +1,225 @@
+import hashlib
+import re
 import time
+import unicodedata
+import zlib
 
+import numpy as np
 import pandas as pd
 
+from table_io import TableWriter, iter_table
 
-def drop_dupes():
-    data = pd.read_csv(
-        "C:/Users/ASUS/Desktop/Thames Work/Data Science Project 2024/New CSV/combined_output.csv"
+# Mersenne prime for the MinHash permutations, small enough that a * hash fits uint64
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalise_title(title):
+    """Lowercase a title and strip accents, punctuation and extra spaces."""
+    if not isinstance(title, str):
+        return ""
+    if not title.isascii():
+        title = unicodedata.normalize("NFKD", title)
+        title = "".join(char for char in title if not unicodedata.combining(char))
+    title = re.sub(r"[^\w\s]", " ", title.lower())
+    return " ".join(title.split())
+
+
+def split_title(title):
+    """The main title and the subtitle (after ':' or ' - '), which may be None."""
+    if not isinstance(title, str):
+        return "", None
+    parts = re.split(r":| - | – ", title, maxsplit=1)
+    return parts[0], parts[1] if len(parts) > 1 else None
+
+
+def main_title(title):
+    """The part of a title before its subtitle."""
+    return split_title(title)[0]
+
+
+def title_digest(normalised_title):
+    """A compact, stable hash of a normalised title."""
+    return hashlib.blake2b(normalised_title.encode("utf-8"), digest_size=8).digest()
+
+
+class NearDuplicateFinder:
+    """Find titles that are the same paper using exact hashes and MinHash/LSH."""
+
+    def __init__(
+        self,
+        threshold=0.8,
+        num_perm=64,
+        bands=16,
+        shingle_size=5,
+        subtitle_min_words=0,
+        seed=1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        # Estimated Jaccard similarity above which two titles are the same paper
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # A title matches the same title without its subtitle, if the main title has
+        # at least this many words. Off by default (0), two different subtitles of
+        # one main title never match this way
+        self.subtitle_min_words = subtitle_min_words
+
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        # Only canonical titles are indexed, duplicates point straight at them
+        self.exact = {}
+        # Main titles of the canonical titles that have a subtitle
+        self.main_titles = {}
+        self.buckets = [{} for _ in range(bands)]
+        # Signatures of the canonical rows, grown by doubling
+        self.signatures = np.zeros((1024, num_perm), dtype=np.uint32)
+        self.canonical_rows = []
+        # The shingles of each canonical subtitle, None for titles without one
+        self.subtitles = []
+
+    def shingles(self, normalised_title):
+        size = self.shingle_size
+        return {
+            normalised_title[i : i + size]
+            for i in range(max(1, len(normalised_title) - size + 1))
+        }
+
+    def same_subtitle(self, shingles, other):
+        """Titles that both have a subtitle need alike subtitles, e.g. not CT and MRI."""
+        if shingles is None or other is None:
+            return True
+        return len(shingles & other) / len(shingles | other) >= self.threshold
+
+    def signature(self, normalised_title):
+        """MinHash signature of the character shingles of a title."""
+        shingles = self.shingles(normalised_title)
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        hashes %= MERSENNE_PRIME
+        # One row per permutation, the minimum over the shingles is the signature
+        permuted = (
+            self.a[:, None] * hashes[None, :] + self.b[:, None]
+        ) % MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature):
+        rows = self.rows
+        return [
+            signature[band * rows : (band + 1) * rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def find(self, row, title):
+        """Return (canonical row, similarity, match) or None if the title is new."""
+        normalised_title = normalise_title(title)
+        digest = title_digest(normalised_title)
+        if digest in self.exact:
+            return self.exact[digest], 1.0, "exact"
+
+        main_digest = None
+        main, subtitle = split_title(title)
+        main = normalise_title(main)
+        subtitle = normalise_title(subtitle)
+        subtitle = self.shingles(subtitle) if subtitle else None
+        if self.subtitle_min_words and len(main.split()) >= self.subtitle_min_words:
+            if main != normalised_title:
+                # "Main: Subtitle" matches an earlier plain "Main"
+                main_digest = title_digest(main)
+                if main_digest in self.exact:
+                    return self.exact[main_digest], 1.0, "subtitle"
+            elif digest in self.main_titles:
+                # A plain "Main" matches an earlier "Main: Subtitle"
+                return self.main_titles[digest], 1.0, "subtitle"
+
+        signature = self.signature(normalised_title)
+        keys = self.band_keys(signature)
+        candidates = sorted(
+            {
+                candidate
+                for band, key in enumerate(keys)
+                for candidate in self.buckets[band].get(key, ())
+            }
+        )
+        if candidates:
+            similarities = (self.signatures[candidates] == signature).mean(axis=1)
+            # Best first, a stable sort so ties go to the earliest canonical row
+            for best in np.argsort(-similarities, kind="stable"):
+                if similarities[best] < self.threshold:
+                    break
+                candidate = candidates[best]
+                if self.same_subtitle(subtitle, self.subtitles[candidate]):
+                    best_row = self.canonical_rows[candidate]
+                    return best_row, float(similarities[best]), "minhash"
+
+        # A new paper, index it so later rows can match it
+        self.exact[digest] = row
+        if main_digest is not None:
+            self.main_titles.setdefault(main_digest, row)
+        self.add_signature(row, signature, keys, subtitle)
+        return None
+
+    def add_signature(self, row, signature, keys, subtitle=None):
+        index = len(self.canonical_rows)
+        if index == len(self.signatures):
+            self.signatures = np.concatenate(
+                [self.signatures, np.zeros_like(self.signatures)]
+            )
+        self.signatures[index] = signature
+        self.canonical_rows.append(row)
+        self.subtitles.append(subtitle)
+        for band, key in enumerate(keys):
+            self.buckets[band].setdefault(key, []).append(index)
+
+
+def drop_dupes(input_file, output_file, mapping_file, finder=None, chunksize=100_000):
+    """Stream the table, keep the first row of each paper and map the duplicates."""
+    finder = finder or NearDuplicateFinder()
+    duplicates = []
+    row = 0
+    with TableWriter(output_file) as writer:
+        for chunk in iter_table(input_file, chunksize=chunksize):
+            keep = np.ones(len(chunk), dtype=bool)
+            for position, title in enumerate(chunk["Title"]):
+                match = finder.find(row, title)
+                if match is not None:
+                    keep[position] = False
+                    canonical_row, similarity, match_type = match
+                    duplicates.append(
+                        (row, canonical_row, similarity, match_type, title)
+                    )
+                row += 1
+            writer.write(chunk[keep])
+
+    mapping = pd.DataFrame(
+        duplicates,
+        columns=["Row", "Canonical Row", "Similarity", "Match", "Title"],
     )
-    data_cleaned = data.drop_duplicates(subset=["Title"])
-    data_cleaned.to_csv(
-        "C:/Users/ASUS/Desktop/Thames Work/Data Science Project 2024/New CSV/no_dupes.csv",
-        index=False,
+    mapping.to_csv(mapping_file, index=False)
+    print(
+        f"{len(duplicates)} of {row} rows were duplicates, "
+        f"cleaned file saved as '{output_file}'"
     )
-    print("Duplicates removed, cleaned file saved as 'cleaned_file.csv'")
+    return mapping
 
 
-start_time = time.time()
+if __name__ == "__main__":
+    start_time = time.time()
 
-drop_dupes()
+    # Works with both .csv and .parquet files
+    drop_dupes(
+        "C:/Users/ASUS/Desktop/Thames Work/Data Science Project 2024/New CSV/combined_output.parquet",
+        "C:/Users/ASUS/Desktop/Thames Work/Data Science Project 2024/New CSV/no_dupes.parquet",
+        "C:/Users/ASUS/Desktop/Thames Work/Data Science Project 2024/New CSV/duplicate_mapping.csv",
+    )
 
-end_time = time.time()
-elapsed_time = end_time - start_time
-print(f"\nTime taken: {elapsed_time:.2f} seconds")
+    end_time = time.time()
+    elapsed_time = end_time - start_time
+    print(f"\nTime taken: {elapsed_time:.2f} seconds")
@@ -0,0 +1,37 @@
+import numpy as np
+
+# Columns that can list several values for one paper
+SPLIT_COLUMNS = ("Country", "Institution")
+
+
+def split_column(values, separator=", ", strip=None):
+    """Split a column of lists and/or separator joined strings, one row per value.
+
+    The index of the result repeats the index of the row each value came from.
+    """
+    # Lists are exploded first, then every string is split, so both forms work
+    values = values.astype(object).explode()
+    # Other values, e.g. a Country read as the number 5, are split as "5" not NaN
+    values = values.where(values.isna(), values.astype(str))
+    if strip is not None:
+        values = values.str.replace(strip, "", regex=True)
+    return values.str.split(separator).explode()
+
+
+def split_rows(df, columns=SPLIT_COLUMNS, separator=", ", strip=None, paper_id=None):
+    """Repeat each row once per value of every column, over whole columns at once.
+
+    With paper_id set, a column of that name keeps the row number each row came
+    from in df, so the rows of one paper can be found again. strip is a regex
+    removed from the values before they are split.
+    """
+    df = df.reset_index(drop=True)
+    if paper_id is not None:
+        df[paper_id] = np.arange(len(df))
+    for column in columns:
+        values = split_column(df[column], separator, strip)
+        # The index of the values is the position of their row, repeat the rows
+        df = df.take(values.index.to_numpy())
+        df[column] = values.to_numpy()
+        df = df.reset_index(drop=True)
+    return df
@@ -0,0 +1,94 @@
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # Only the peak RSS needs it
+    psutil = None
+
+
+class RssSampler:
+    """Sample the resident memory of this process and its children in a thread.
+
+    The peak is the highest total seen while the sampler ran, so each stage gets its
+    own peak instead of the high-water mark of the whole run.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample_until_stopped, daemon=True)
+
+    def rss(self):
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass  # The worker exited between listing and reading it
+        return total
+
+    def sample(self):
+        self.peak = max(self.peak, self.rss())
+
+    def sample_until_stopped(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self.thread.start()
+
+    def stop(self):
+        """Stop sampling and return the peak in MB."""
+        self.stopped.set()
+        self.thread.join()
+        self.sample()
+        return self.peak / (1024 * 1024)
+
+
+class StageTimer:
+    """Collect the wall time, records and peak RSS of each stage.
+
+    With sample_rss=False, or without psutil, only the time and records are kept.
+    """
+
+    def __init__(self, sample_rss=True):
+        self.sample_rss = sample_rss and psutil is not None
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, records=0):
+        sampler = RssSampler() if self.sample_rss else None
+        if sampler is not None:
+            sampler.start()
+        start_time = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start_time
+        peak_mb = sampler.stop() if sampler is not None else None
+        self.add(name, seconds, records, peak_mb)
+
+    def add(self, name, seconds, records=0, peak_rss_mb=None):
+        stats = self.stages.setdefault(
+            name, {"seconds": 0.0, "records": 0, "peak_rss_mb": None}
+        )
+        stats["seconds"] += seconds
+        stats["records"] += records
+        if peak_rss_mb is not None:
+            stats["peak_rss_mb"] = max(stats["peak_rss_mb"] or 0.0, peak_rss_mb)
+
+    def merge(self, stages, prefix=""):
+        """Add the stages of another timer, e.g. one sent back by a worker."""
+        for name, stats in stages.items():
+            self.add(
+                prefix + name, stats["seconds"], stats["records"], stats["peak_rss_mb"]
+            )
+
+    def results(self):
+        for stats in self.stages.values():
+            seconds = stats["seconds"]
+            stats["records_per_sec"] = stats["records"] / seconds if seconds else 0.0
+        return self.stages
@@ -0,0 +1,155 @@
+import json
+import os
+import random
+
+TOPIC_WORDS = [
+    "deep",
+    "learning",
+    "neural",
+    "network",
+    "power",
+    "grid",
+    "cancer",
+    "cell",
+    "protein",
+    "solar",
+    "energy",
+    "battery",
+    "robot",
+    "vision",
+    "signal",
+    "wireless",
+    "antenna",
+    "drug",
+    "delivery",
+    "water",
+    "soil",
+    "climate",
+    "market",
+    "policy",
+    "sensor",
+    "control",
+    "graphene",
+    "catalyst",
+    "vaccine",
+    "diagnosis",
+    "traffic",
+    "blockchain",
+    "optimization",
+    "polymer",
+    "membrane",
+]
+# Includes spellings that need the fuzzy country matching
+COUNTRIES = [
+    ("Thailand", "Bangkok"),
+    ("Japan", "Tokyo"),
+    ("United States", "Boston"),
+    ("USA", "Seattle"),
+    ("Germany", "Berlin"),
+    ("Viet Nam", "Hanoi"),
+    ("China", "Beijing"),
+    ("South Korea", "Seoul"),
+    ("United Kingdom", "London"),
+    ("India", "Mumbai"),
+    ("Brazil", "Sao Paulo"),
+    ("Australia", "Sydney"),
+]
+
+
+class SyntheticCorpus:
+    """Generate Scopus-like abstracts-retrieval-response files for benchmarking."""
+
+    def __init__(self, years=3, papers=1000, authors=5000, institutions=300, seed=42):
+        self.years = years
+        self.papers = papers
+        self.authors = authors
+        self.institutions = institutions
+        self.seed = seed
+        self.start_year = 2018
+
+    def make_author(self, rng):
+        author_id = rng.randrange(self.authors)
+        return {
+            "@seq": "1",
+            "ce:initials": "A.",
+            "preferred-name": {
+                "ce:given-name": f"Given{author_id}",
+                "ce:surname": f"Surname{author_id % 997}",
+            },
+            "@auid": str(57000000000 + author_id),
+        }
+
+    def make_affiliation(self, rng):
+        institution_id = rng.randrange(self.institutions)
+        country, city = COUNTRIES[institution_id % len(COUNTRIES)]
+        return {
+            "affilname": f"University of Synthetic Science {institution_id}",
+            "affiliation-city": city,
+            "affiliation-country": country,
+            "@id": str(60000000 + institution_id),
+        }
+
+    def make_record(self, rng, year, paper):
+        """Build one record, with the same gaps that real Scopus data has."""
+        title = " ".join(rng.sample(TOPIC_WORDS, rng.randint(4, 9)))
+        response = {
+            "coredata": {
+                "dc:title": f"{title.capitalize()} {year}-{paper}",
+                "prism:coverDate": f"{year}-{rng.randint(1, 12):02d}-01",
+                "dc:description": " ".join(rng.choices(TOPIC_WORDS, k=120)),
+                "citedby-count": str(rng.randint(0, 300)),
+            },
+            "authors": {
+                "author": [self.make_author(rng) for _ in range(rng.randint(1, 8))]
+            },
+            # Unused bulk, like the references of real records
+            "item": {
+                "bibrecord": {
+                    "tail": {
+                        "bibliography": {
+                            "reference": [
+                                {
+                                    "ref-fulltext": " ".join(
+                                        rng.choices(TOPIC_WORDS, k=20)
+                                    )
+                                }
+                                for _ in range(rng.randint(5, 30))
+                            ]
+                        }
+                    }
+                }
+            },
+        }
+
+        # Affiliations are a list, a single dict, or missing
+        affiliation_kind = rng.random()
+        if affiliation_kind < 0.6:
+            response["affiliation"] = [
+                self.make_affiliation(rng) for _ in range(rng.randint(1, 3))
+            ]
+        elif affiliation_kind < 0.85:
+            response["affiliation"] = self.make_affiliation(rng)
+
+        if rng.random() < 0.7:
+            response["authkeywords"] = {
+                "author-keyword": [
+                    {"@_fa": "true", "$": keyword}
+                    for keyword in rng.sample(TOPIC_WORDS, rng.randint(2, 6))
+                ]
+            }
+        return {"abstracts-retrieval-response": response}
+
+    def write(self, root_folder):
+        """Write the corpus as <root>/<year>/<id> files without an extension."""
+        rng = random.Random(self.seed)
+        file_count = 0
+        for year in range(self.start_year, self.start_year + self.years):
+            year_folder = os.path.join(root_folder, str(year))
+            os.makedirs(year_folder, exist_ok=True)
+            for paper in range(self.papers):
+                record = self.make_record(rng, year, paper)
+                file_path = os.path.join(year_folder, f"{year}{paper:07d}")
+                with open(file_path, "w", encoding="utf-8") as f:
+                    json.dump(record, f)
+                file_count += 1
+        return file_count
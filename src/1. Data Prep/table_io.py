@@ -0,0 +1,221 @@
+import ast
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Columns that hold a list per paper before they are exploded
+LIST_COLUMNS = ("Authors", "Institution", "City", "Country", "Keywords")
+# Columns with a few distinct values that repeat a lot once they are exploded
+CATEGORY_COLUMNS = ("Institution", "Country")
+
+
+def is_parquet(file_path):
+    return file_path.endswith(".parquet")
+
+
+def parse_list(value):
+    """Turn a list stored as its Python repr in a CSV back into a list."""
+    if isinstance(value, str) and value.startswith("["):
+        return ast.literal_eval(value)
+    return value
+
+
+def fix_parquet_lists(df):
+    """Parquet lists come back as arrays, turn them into lists like the CSV path."""
+    for column in LIST_COLUMNS:
+        if column in df.columns and df[column].dtype == object:
+            df[column] = [
+                value.tolist() if isinstance(value, np.ndarray) else value
+                for value in df[column]
+            ]
+    return df
+
+
+def parse_csv_lists(df):
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].map(parse_list)
+    return df
+
+
+def restore_categories(df):
+    """Store the exploded Country/Institution columns as categories."""
+    for column in CATEGORY_COLUMNS:
+        if (
+            column in df.columns
+            and df[column].dtype != "category"
+            and not df[column].map(type).eq(list).any()
+        ):
+            df[column] = df[column].astype("category")
+    return df
+
+
+def read_table(file_path, columns=None):
+    """Read a CSV or Parquet table, only loading the given columns."""
+    if is_parquet(file_path):
+        df = pd.read_parquet(file_path, columns=columns)
+        # Files written in chunks store plain strings instead of categories
+        return restore_categories(fix_parquet_lists(df))
+    df = pd.read_csv(file_path, usecols=columns, on_bad_lines="warn")
+    return restore_categories(parse_csv_lists(df))
+
+
+def table_columns(file_path):
+    """List the columns of a table without reading its rows."""
+    if is_parquet(file_path):
+        return pq.ParquetFile(file_path).schema_arrow.names
+    return pd.read_csv(file_path, nrows=0).columns.tolist()
+
+
+def iter_table(file_path, chunksize=100_000, columns=None):
+    """Read a CSV or Parquet table a chunk of rows at a time."""
+    if is_parquet(file_path):
+        parquet_file = pq.ParquetFile(file_path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield fix_parquet_lists(batch.to_pandas())
+        return
+
+    for chunk in pd.read_csv(
+        file_path, usecols=columns, chunksize=chunksize, on_bad_lines="warn"
+    ):
+        yield parse_csv_lists(chunk)
+
+
+def has_null(data_type):
+    """Whether a type is null or holds one, like list<null> from only empty lists."""
+    if pa.types.is_null(data_type):
+        return True
+    if pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        return has_null(data_type.value_type)
+    if pa.types.is_struct(data_type):
+        return any(has_null(field.type) for field in data_type)
+    return False
+
+
+def fill_null(data_type):
+    """The type with every null in it replaced by string."""
+    if pa.types.is_null(data_type):
+        return pa.string()
+    if pa.types.is_list(data_type):
+        return pa.list_(fill_null(data_type.value_type))
+    if pa.types.is_large_list(data_type):
+        return pa.large_list(fill_null(data_type.value_type))
+    if pa.types.is_struct(data_type):
+        return pa.struct(
+            [field.with_type(fill_null(field.type)) for field in data_type]
+        )
+    return data_type
+
+
+class TableWriter:
+    """Append chunks of rows to one CSV or Parquet file."""
+
+    def __init__(self, file_path, schema=None, hold_rows=1_000_000):
+        self.file_path = file_path
+        # The Parquet schema, taken from the chunks when it is not given
+        self.schema = schema
+        # Rows held back at most while waiting for the type of an all-null column
+        self.hold_rows = hold_rows
+        self.parquet_writer = None
+        self.pending = []
+        self.rows = 0
+        self.empty_df = None
+
+    def write(self, df):
+        if df.empty:
+            # Empty chunks have no column types, only keep one in case nothing follows
+            self.empty_df = df
+            return
+
+        # Categories differ from chunk to chunk, Parquet dictionary encodes anyway
+        categories = df.select_dtypes("category").columns
+        df = df.astype({column: object for column in categories})
+
+        if not is_parquet(self.file_path):
+            df.to_csv(
+                self.file_path,
+                mode="a" if self.rows else "w",
+                index=False,
+                header=not self.rows,
+            )
+        else:
+            self.write_parquet(pa.Table.from_pandas(df, preserve_index=False))
+        self.rows += len(df)
+
+    def write_parquet(self, table, final=False):
+        if self.parquet_writer is None:
+            self.pending.append(table)
+            if self.schema is None:
+                schema = self.pending_schema()
+                # A column that was all null so far, or only held empty lists, has
+                # no type yet, so hold the chunks back until a later chunk shows it
+                if any(has_null(field.type) for field in schema):
+                    held = sum(len(table) for table in self.pending)
+                    if not final and held < self.hold_rows:
+                        return
+                    if not final:
+                        # Waited long enough, most columns hold text
+                        schema = pa.schema(
+                            [
+                                field.with_type(fill_null(field.type))
+                                for field in schema
+                            ],
+                            metadata=schema.metadata,
+                        )
+                self.schema = schema
+            self.parquet_writer = pq.ParquetWriter(self.file_path, self.schema)
+            tables, self.pending = self.pending, []
+        else:
+            tables = [table]
+        for table in tables:
+            self.parquet_writer.write_table(self.conform(table))
+
+    def pending_schema(self):
+        """Every column with the first fully known type among the held chunks."""
+        fields = {}
+        for table in self.pending:
+            for field in table.schema:
+                if field.name not in fields or has_null(fields[field.name].type):
+                    fields[field.name] = field
+        return pa.schema(fields.values(), metadata=self.pending[0].schema.metadata)
+
+    def conform(self, table):
+        """Cast a chunk to the schema of the file, e.g. CSV years read as numbers."""
+        columns = []
+        for field in self.schema:
+            if field.name not in table.column_names:
+                columns.append(pa.nulls(len(table), field.type))
+            elif table[field.name].type != field.type:
+                columns.append(table[field.name].cast(field.type))
+            else:
+                columns.append(table[field.name])
+        return pa.Table.from_arrays(columns, schema=self.schema)
+
+    def close(self):
+        if self.pending:
+            self.write_parquet(self.pending.pop(), final=True)
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        elif self.rows == 0 and self.empty_df is not None:
+            write_table(self.empty_df, self.file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_table(df, file_path):
+    """Write a table as CSV or Parquet, Parquet keeps lists and categories typed."""
+    if not is_parquet(file_path):
+        df.to_csv(file_path, index=False)
+        return
+
+    categories = {}
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not df[column].map(type).eq(list).any():
+            categories[column] = df[column].astype("category")
+    df.assign(**categories).to_parquet(file_path, index=False)
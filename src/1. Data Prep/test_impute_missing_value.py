@@ -0,0 +1,192 @@
+import random
+import unittest
+
+import numpy as np
+import pandas as pd
+import pycountry
+from rapidfuzz import process
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from impute_missing_value import ImputeMissingValue
+
+AUTHORS = [f"Author {i}" for i in range(60)]
+INSTITUTIONS = [f"University {i}" for i in range(15)] + ["Not Available"]
+COUNTRIES = ["Thailand", "japan", "Germany", "Frence", "not available", "Atlantis"]
+WORDS = (
+    "deep learning graph neural network protein image segmentation federated "
+    "privacy language model robot control quantum chemistry climate forecast"
+).split()
+KEYWORDS = ["machine learning", "biology", "vision", "physics", "nlp", "robotics"]
+
+
+def fixture(n=400, seed=0):
+    """Papers where about a third miss institutions and half miss keywords."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        institutions = rng.sample(INSTITUTIONS, rng.randint(1, 2))
+        records.append(
+            {
+                "Title": f"{' '.join(rng.sample(WORDS, rng.randint(2, 6)))} {i}",
+                "Authors": rng.sample(AUTHORS, rng.randint(1, 3)),
+                "Institution": institutions if rng.random() > 0.35 else [],
+                "City": ["Bangkok"],
+                "Country": rng.sample(COUNTRIES, rng.randint(1, 2)),
+                "Keywords": (
+                    rng.sample(KEYWORDS, rng.randint(1, 3))
+                    if rng.random() > 0.5
+                    else []
+                ),
+                "Date": f"2020-0{rng.randint(1, 9)}-01" if rng.random() > 0.2 else None,
+            }
+        )
+    return records
+
+
+class PerRowImpute:
+    """The per-row implementation the vectorised steps replaced."""
+
+    def create_author_to_institution_mapping(self, df):
+        author_to_institution = {}
+        for _, row in df.iterrows():
+            if isinstance(row["Authors"], list) and isinstance(
+                row["Institution"], list
+            ):
+                for author in row["Authors"]:
+                    author_to_institution.setdefault(author, set()).update(
+                        row["Institution"]
+                    )
+        return author_to_institution
+
+    def impute_institution(self, row, author_to_institution, most_common_institution):
+        if not isinstance(row["Institution"], list) or len(row["Institution"]) == 0:
+            institutions = set()
+            if isinstance(row["Authors"], list):
+                for author in row["Authors"]:
+                    if author in author_to_institution:
+                        institutions.update(author_to_institution[author])
+            if institutions:
+                return list(institutions)
+            return [most_common_institution]
+        return row["Institution"]
+
+    def infer_keywords(self, row, df, similarity_matrix):
+        keywords = row["Keywords"]
+        if keywords and len(keywords) > 0:
+            return keywords
+        for idx in similarity_matrix[row.name].argsort()[::-1]:
+            similar_keywords = df.loc[idx, "Keywords"]
+            if similar_keywords and len(similar_keywords) > 0:
+                return similar_keywords
+        return []
+
+    def clean_country(self, country_name):
+        country_name = country_name.strip().lower()
+        valid_country_names = [country.name.lower() for country in pycountry.countries]
+        if country_name:
+            match = process.extractOne(
+                country_name, valid_country_names, score_cutoff=80
+            )
+            return match[0].title() if match else "Unknown"
+        return "Unknown"
+
+    def expand_and_clean_location(self, df):
+        def safe_str(x):
+            if isinstance(x, list):
+                return ", ".join(str(item) for item in x)
+            elif pd.notna(x):
+                return str(x)
+            return ""
+
+        df["Country"] = df["Country"].apply(safe_str)
+        df["Institution"] = df["Institution"].apply(safe_str)
+        df["Country"] = df["Country"].str.replace(r"[\[\]']", "", regex=True)
+        df["Institution"] = df["Institution"].str.replace(r"[\[\]']", "", regex=True)
+        df = (
+            df.assign(Country=df["Country"].str.split(", "))
+            .assign(Institution=lambda x: x["Institution"].str.split(", "))
+            .explode("Country")
+            .explode("Institution")
+            .drop_duplicates(subset=["Title", "Institution"])
+        )
+        df["Country"] = df["Country"].apply(self.clean_country)
+        return df[df["Country"] != "Unknown"].reset_index(drop=True)
+
+
+class EquivalenceTest(unittest.TestCase):
+    """The vectorised steps give the same result as the per-row ones."""
+
+    def setUp(self):
+        self.imputer = ImputeMissingValue()
+        self.reference = PerRowImpute()
+        self.df = self.imputer.clean_institution_names(
+            self.imputer.extract_data(fixture())
+        )
+
+    def test_institution(self):
+        df = self.df
+        most_common = self.imputer.find_most_common_institution(df)
+        mapping = self.reference.create_author_to_institution_mapping(df)
+        expected = df.apply(
+            lambda row: self.reference.impute_institution(row, mapping, most_common),
+            axis=1,
+        ).tolist()
+
+        result = self.imputer.impute_institution(
+            df.copy(),
+            self.imputer.create_author_to_institution_mapping(df),
+            most_common,
+        )
+        self.assertGreater(sum(len(x) == 0 for x in df["Institution"]), 50)
+        # The per-row version returned the institutions of a set, in any order
+        self.assertEqual(
+            [sorted(x) for x in result["Institution"]], [sorted(x) for x in expected]
+        )
+
+    def test_keywords(self):
+        df = self.df.copy()
+        vectorizer = CountVectorizer(stop_words="english", max_features=100)
+        similarity = cosine_similarity(vectorizer.fit_transform(df["Title"]))
+        expected = df.apply(
+            lambda row: self.reference.infer_keywords(row, df, similarity), axis=1
+        ).tolist()
+
+        # Small chunks so the missing rows are compared over several chunks
+        result = self.imputer.clean_keywords(df.copy(), chunk_elements=1000)
+        candidates = [i for i, x in enumerate(df["Keywords"]) if len(x) > 0]
+        ties = 0
+        for row, keywords in enumerate(result["Keywords"]):
+            if list(keywords) == list(expected[row]):
+                continue
+            # Candidates with exactly the same similarity can be taken in any order,
+            # so both answers must come from one of the most similar candidates
+            best = max(similarity[row, i] for i in candidates)
+            tied = [
+                list(df["Keywords"][i])
+                for i in candidates
+                if np.isclose(similarity[row, i], best, rtol=0, atol=1e-9)
+            ]
+            self.assertIn(list(keywords), tied)
+            self.assertIn(list(expected[row]), tied)
+            ties += 1
+        self.assertGreater(len(df) - len(candidates), 100)
+        self.assertLess(ties, len(df) - len(candidates))
+
+    def test_location(self):
+        imputed = self.imputer.impute_institution(
+            self.df.copy(),
+            self.imputer.create_author_to_institution_mapping(self.df),
+            "Unknown",
+        )
+        columns = ["Title", "Institution", "Country"]
+        result = self.imputer.expand_and_clean_location(imputed.copy())[columns]
+        expected = self.reference.expand_and_clean_location(imputed.copy())[columns]
+        self.assertGreater(len(result), len(self.df))
+        self.assertEqual(
+            result.astype(str).values.tolist(), expected.astype(str).values.tolist()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+import pandas as pd
+
+from record_store import RecordStore
+
+COLUMNS = ["Title", "Authors", "Country", "Keywords", "Date"]
+
+
+def load(records):
+    store = RecordStore()
+    for column in COLUMNS:
+        store.add_field(column)
+    store.extend(records, batch_size=2)
+    return store.to_dataframe(COLUMNS)
+
+
+class RecordStoreTest(unittest.TestCase):
+    def test_round_trip(self):
+        records = [
+            {
+                "Title": "A",
+                "Authors": ["Ann", "Bob"],
+                "Country": ["Thailand"],
+                "Keywords": ["deep learning"],
+                "Date": "2020-01-01",
+            },
+            {
+                "Title": "B",
+                "Authors": ["Bob", None],
+                "Country": None,
+                "Keywords": [],
+                "Date": None,
+            },
+            {"Title": "C", "Authors": "Carl", "Keywords": ["deep learning"]},
+        ]
+        df = load(records)
+        expected = pd.DataFrame(
+            [{column: record.get(column) for column in COLUMNS} for record in records],
+            columns=COLUMNS,
+        )
+        self.assertEqual(df.to_dict("records"), expected.to_dict("records"))
+
+    def test_repeated_strings_are_shared(self):
+        # Two copies that are equal but not the same object, like two parsed records
+        records = [{"Authors": ["".join(["Ann", " Lee"])]} for _ in range(3)]
+        df = load(records)
+        authors = [row[0] for row in df["Authors"]]
+        self.assertTrue(all(author is authors[0] for author in authors))
+
+    def test_values_that_are_not_strings_are_kept(self):
+        records = [
+            {"Country": [1], "Date": 1},
+            {"Country": [True], "Date": True},
+            {"Country": [["Thailand", "Japan"]], "Date": 2020.0},
+            {"Country": ["Thailand", float("nan")], "Date": float("nan")},
+        ]
+        df = load(records)
+        self.assertEqual(df["Country"][0], [1])
+        self.assertIs(df["Country"][1][0], True)
+        self.assertEqual(df["Country"][2], [["Thailand", "Japan"]])
+        self.assertEqual(df["Country"][3], ["Thailand", None])
+        self.assertEqual(type(df["Date"][0]), int)
+        self.assertIs(df["Date"][1], True)
+        self.assertEqual(df["Date"][2], 2020.0)
+        self.assertIsNone(df["Date"][3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from remove_duplicates import NearDuplicateFinder, drop_dupes
+
+SURVEY = "A survey of deep learning for medical image segmentation"
+
+
+def matches(finder, titles):
+    """The match of every title against the ones before it."""
+    return [finder.find(row, title) for row, title in enumerate(titles)]
+
+
+class NearDuplicateFinderTest(unittest.TestCase):
+    def test_exact(self):
+        result = matches(
+            NearDuplicateFinder(),
+            [SURVEY, "a SURVEY of deep-learning for médical image segmentation!"],
+        )
+        self.assertIsNone(result[0])
+        self.assertEqual(result[1], (0, 1.0, "exact"))
+
+    def test_minhash(self):
+        result = matches(
+            NearDuplicateFinder(),
+            [
+                "Federated learning for privacy preserving medical image analysis",
+                "Federated learning for privacy-preserving medical images analysis",
+                "Reinforcement learning for robot navigation in crowded spaces",
+            ],
+        )
+        canonical_row, similarity, match = result[1]
+        self.assertEqual((canonical_row, match), (0, "minhash"))
+        self.assertGreaterEqual(similarity, 0.8)
+        self.assertIsNone(result[2])
+
+    def test_different_subtitles_are_different_papers(self):
+        for finder in (
+            NearDuplicateFinder(),
+            NearDuplicateFinder(subtitle_min_words=6),
+        ):
+            result = matches(finder, [f"{SURVEY}: CT", f"{SURVEY}: MRI"])
+            self.assertEqual(result, [None, None])
+
+    def test_subtitle_is_opt_in(self):
+        titles = [SURVEY, f"{SURVEY}: a review of recent methods and open problems"]
+        self.assertEqual(matches(NearDuplicateFinder(), titles), [None, None])
+
+        result = matches(NearDuplicateFinder(subtitle_min_words=6), titles)
+        self.assertEqual(result, [None, (0, 1.0, "subtitle")])
+        # Also the other way round, the subtitle first
+        result = matches(NearDuplicateFinder(subtitle_min_words=6), titles[::-1])
+        self.assertEqual(result, [None, (0, 1.0, "subtitle")])
+
+    def test_short_main_titles_do_not_match(self):
+        result = matches(
+            NearDuplicateFinder(subtitle_min_words=6),
+            ["Deep learning", "Deep learning: a review of recent methods"],
+        )
+        self.assertEqual(result, [None, None])
+
+
+class DropDupesTest(unittest.TestCase):
+    def test_keeps_the_first_row_of_each_paper(self):
+        folder = tempfile.mkdtemp()
+        try:
+            input_file = os.path.join(folder, "combined_output.parquet")
+            output_file = os.path.join(folder, "no_dupes.parquet")
+            mapping_file = os.path.join(folder, "duplicate_mapping.csv")
+            pd.DataFrame(
+                {
+                    "Title": [f"{SURVEY}: CT", f"{SURVEY}: MRI", f"{SURVEY}: ct."],
+                    "Year": ["2020", "2021", "2022"],
+                }
+            ).to_parquet(input_file, index=False)
+
+            mapping = drop_dupes(input_file, output_file, mapping_file, chunksize=2)
+
+            self.assertEqual(
+                pd.read_parquet(output_file)["Year"].tolist(), ["2020", "2021"]
+            )
+            self.assertEqual(
+                mapping[["Row", "Canonical Row", "Match"]].values.tolist(),
+                [[2, 0, "exact"]],
+            )
+        finally:
+            shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    unittest.main()
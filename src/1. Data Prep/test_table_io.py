@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from table_io import TableWriter
+
+
+class TableWriterTest(unittest.TestCase):
+    """Chunks whose column types only show up in a later chunk."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.folder, "table.parquet")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write(self, chunks, **kwargs):
+        with TableWriter(self.file_path, **kwargs) as writer:
+            for chunk in chunks:
+                writer.write(pd.DataFrame(chunk))
+        return pq.read_table(self.file_path)
+
+    def test_only_empty_lists_then_values(self):
+        df = self.write(
+            [
+                {"Title": ["a"], "Keywords": [[]]},
+                {"Title": ["b"], "Keywords": [["k"]]},
+            ]
+        )
+        self.assertEqual(df["Keywords"].to_pylist(), [[], ["k"]])
+        self.assertEqual(df.schema.field("Keywords").type, pa.list_(pa.string()))
+
+    def test_all_null_column_then_strings(self):
+        df = self.write(
+            [
+                {"Title": ["a"], "Date": [None]},
+                {"Title": ["b"], "Date": ["2020-01-01"]},
+            ]
+        )
+        self.assertEqual(df["Date"].to_pylist(), [None, "2020-01-01"])
+
+    def test_null_after_the_held_rows_become_strings(self):
+        df = self.write(
+            [
+                {"Title": ["a"], "Date": [None], "Keywords": [[]]},
+                {"Title": ["b"], "Date": [None], "Keywords": [[]]},
+                {"Title": ["c"], "Date": ["2020-01-01"], "Keywords": [["k"]]},
+            ],
+            hold_rows=2,
+        )
+        self.assertEqual(df["Date"].to_pylist(), [None, None, "2020-01-01"])
+        self.assertEqual(df["Keywords"].to_pylist(), [[], [], ["k"]])
+
+    def test_null_until_the_end(self):
+        df = self.write([{"Title": ["a"], "Date": [None]}])
+        self.assertEqual(df["Date"].to_pylist(), [None])
+        self.assertEqual(df.schema.field("Date").type, pa.null())
+
+    def test_missing_and_mistyped_columns(self):
+        # E.g. a year read as a number from one CSV and as text from another
+        df = self.write(
+            [
+                {"Title": ["a"], "Year": ["2020"]},
+                {"Title": ["b"], "Year": [2021]},
+                {"Title": ["c"]},
+            ]
+        )
+        self.assertEqual(df["Year"].to_pylist(), ["2020", "2021", None])
+
+
+if __name__ == "__main__":
+    unittest.main()
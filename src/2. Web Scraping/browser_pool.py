@@ -0,0 +1,76 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class PooledBrowser:
+    """A driver session and the number of pages it has loaded."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+
+class BrowserPool:
+    """A fixed number of long-lived browser sessions shared by worker threads."""
+
+    def __init__(self, create_browser, size=4, max_pages=50):
+        self.create_browser = create_browser
+        self.size = size
+        # Sessions are restarted after this many pages to keep memory in check
+        self.max_pages = max_pages
+
+        # An empty slot (None) is only started when a worker needs it
+        self.idle = queue.Queue()
+        for _ in range(size):
+            self.idle.put(None)
+
+        self.lock = threading.Lock()
+        self.started = 0
+        self.recycled = 0
+        self.crashed = 0
+
+    @contextmanager
+    def browser(self):
+        """Check a session out of the pool, it is recycled if the caller raises."""
+        session = self.idle.get()
+        try:
+            if session is None:
+                session = PooledBrowser(self.create_browser())
+                with self.lock:
+                    self.started += 1
+            yield session
+            session.pages += 1
+            if session.pages >= self.max_pages:
+                self.quit(session)
+                session = None
+                with self.lock:
+                    self.recycled += 1
+        except Exception:
+            # The session may be dead or stuck on a half-loaded page, start a new one
+            self.quit(session)
+            session = None
+            with self.lock:
+                self.crashed += 1
+            raise
+        finally:
+            self.idle.put(session)
+
+    def quit(self, session):
+        if session is None:
+            return
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """Quit every idle session, call it once the workers are done."""
+        for _ in range(self.size):
+            self.quit(self.idle.get())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
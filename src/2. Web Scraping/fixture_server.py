@@ -0,0 +1,97 @@
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DOCUMENT_PATH = re.compile(r"^/document/(\d+)/?$")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive, so connection pooling can be checked
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests += 1
+        match = DOCUMENT_PATH.match(self.path)
+        file_path = (
+            os.path.join(self.server.fixture_folder, f"{match.group(1)}.html")
+            if match
+            else None
+        )
+        if file_path is None or not os.path.isfile(file_path):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        with open(file_path, "rb") as f:
+            body = f.read()
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """Serve <folder>/<doc_id>.html as /document/<doc_id> on a local port."""
+
+    def __init__(self, fixture_folder, port=0, latency=0.0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+        self.server.daemon_threads = True
+        self.server.fixture_folder = fixture_folder
+        # Seconds to wait before each response, to act like a remote server
+        self.server.latency = latency
+        self.server.requests = 0
+        self.server.connections = 0
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    @property
+    def connections(self):
+        return self.server.connections
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    fixture_folder = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "fixtures"
+    )
+    with FixtureServer(fixture_folder, port=8000) as server:
+        print(f"Serving {fixture_folder} at {server.base_url}")
+        print(f"Try: python main.py --mode http --base-url {server.base_url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,85 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+def read_page(object_path):
+    with open(object_path, "rb") as f:
+        return gzip.decompress(f.read()).decode("utf-8")
+
+
+class HtmlCache:
+    """Keep every fetched page gzipped under the hash of its content."""
+
+    def __init__(self, cache_folder):
+        self.cache_folder = cache_folder
+        os.makedirs(os.path.join(cache_folder, "objects"), exist_ok=True)
+
+        # Maps each doc_id to the hash of its latest page, shared by worker threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            os.path.join(cache_folder, "index.sqlite"),
+            timeout=60,
+            check_same_thread=False,
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                doc_id INTEGER PRIMARY KEY,
+                hash TEXT NOT NULL,
+                source TEXT NOT NULL,
+                fetched REAL NOT NULL
+            )
+            """
+        )
+        self.connection.commit()
+
+    def object_path(self, page_hash):
+        return os.path.join(
+            self.cache_folder, "objects", page_hash[:2], f"{page_hash}.html.gz"
+        )
+
+    def store(self, doc_id, html, source):
+        """Save a page, source is "browser" for rendered pages or "http" for raw ones."""
+        data = html.encode("utf-8")
+        page_hash = hashlib.blake2b(data, digest_size=20).hexdigest()
+        object_path = self.object_path(page_hash)
+
+        # Identical pages are only stored once
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            temp_path = f"{object_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(gzip.compress(data, mtime=0))
+            os.replace(temp_path, object_path)
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages (doc_id, hash, source, fetched) "
+                "VALUES (?, ?, ?, ?)",
+                (doc_id, page_hash, source, time.time()),
+            )
+            self.connection.commit()
+        return page_hash
+
+    def pages(self):
+        """List (doc_id, object path) of every cached page."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT doc_id, hash FROM pages ORDER BY doc_id"
+            ).fetchall()
+        return [(doc_id, self.object_path(page_hash)) for doc_id, page_hash in rows]
+
+    def load(self, doc_id):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT hash FROM pages WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        return read_page(self.object_path(row[0])) if row else None
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,69 @@
+import asyncio
+
+import aiohttp
+
+from page_parser import parse_page
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+
+class AsyncFetcher:
+    """Fetch document pages over pooled keep-alive connections without a browser."""
+
+    def __init__(self, scraper, timeout=30):
+        # The scraper gives the URLs and the rate limiter shared with the browsers
+        self.scraper = scraper
+        self.timeout = timeout
+
+    async def fetch(self, session, doc_id):
+        async with self.scraper.rate_limiter.request_async():
+            with self.scraper.metrics.step("http_fetch"):
+                async with session.get(self.scraper.create_url(doc_id)) as response:
+                    # Only overload answers slow the limiter down, a 404 is a missing page
+                    if response.status == 429 or response.status >= 500:
+                        response.raise_for_status()
+                    html = await response.text()
+        try:
+            response.raise_for_status()
+        except aiohttp.ClientResponseError as e:
+            self.scraper.metrics.fail("http_fetch", e)
+            raise
+        return html
+
+    async def fetch_all(self, doc_ids, on_result):
+        """Call on_result(doc_id, html, record, error) as each page arrives."""
+        connector = aiohttp.TCPConnector(
+            limit=self.scraper.rate_limiter.max_concurrency, keepalive_timeout=60
+        )
+        async with aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": USER_AGENT},
+        ) as session:
+
+            async def fetch_one(doc_id):
+                # Every error stays with its document, which goes to the browser
+                try:
+                    html = await self.fetch(session, doc_id)
+                except (
+                    aiohttp.ClientError,
+                    asyncio.TimeoutError,
+                    UnicodeDecodeError,
+                ) as e:
+                    return doc_id, None, None, e
+                try:
+                    with self.scraper.metrics.step("http_parse"):
+                        record = parse_page(html)
+                except Exception as e:
+                    # E.g. metadata of an unexpected shape, the page is still cached
+                    return doc_id, html, None, e
+                return doc_id, html, record, None
+
+            for result in asyncio.as_completed([fetch_one(d) for d in doc_ids]):
+                on_result(*await result)
+
+    def run(self, doc_ids, on_result):
+        asyncio.run(self.fetch_all(doc_ids, on_result))
@@ -1,42 +1,86 @@
 import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+from page_parser import validate_record
 
-def combine_json_files(input_folder, output_file):
-    combined_data = []
 
-    # Loop through all files in the input folder
-    for filename in os.listdir(input_folder):
-        if filename.endswith(".json"):  # Process only JSON files
-            file_path = os.path.join(input_folder, filename)
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                # Add "Previous File" field with the file's relative path
-                data["Previous File"] = file_path
-                combined_data.append(data)
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
+def list_json_files(input_folder):
+    """The .json files of the folder, sorted so the output order is stable."""
+    with os.scandir(input_folder) as entries:
+        return sorted(
+            entry.path
+            for entry in entries
+            if entry.is_file() and entry.name.endswith(".json")
+        )
 
-    # Write the combined data to the output file
+
+def read_record(file_path):
+    """Load and validate one scraped file, returning (record, error)."""
     try:
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(combined_data, f, indent=4, ensure_ascii=False)
-        print(f"Combined JSON file saved to {output_file}")
-    except Exception as e:
-        print(f"Error writing to {output_file}: {e}")
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        return None, str(e)
+
+    errors = validate_record(data)
+    if errors:
+        return None, "; ".join(errors)
+
+    # Add "Previous File" field with the file's relative path
+    data["Previous File"] = file_path
+    return data, None
+
+
+def read_records(executor, file_paths, chunk_size=1000):
+    """Read the files in a thread pool, one chunk at a time so memory stays flat."""
+    for start in range(0, len(file_paths), chunk_size):
+        chunk = file_paths[start : start + chunk_size]
+        yield from zip(chunk, executor.map(read_record, chunk))
+
+
+def combine_json_files(input_folder, output_file, workers=16):
+    """Join the scraped files into one NDJSON file, listing bad files separately."""
+    error_file = os.path.splitext(output_file)[0] + "_errors.ndjson"
+    file_paths = list_json_files(input_folder)
+    record_count = 0
+    error_count = 0
+
+    # Write to temporary files first so a crash never leaves a half-written output
+    with ThreadPoolExecutor(max_workers=workers) as executor, open(
+        output_file + ".tmp", "w", encoding="utf-8"
+    ) as f, open(error_file + ".tmp", "w", encoding="utf-8") as errors:
+        for file_path, (record, error) in read_records(executor, file_paths):
+            if error is None:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                record_count += 1
+            else:
+                errors.write(
+                    json.dumps({"File": file_path, "Error": error}, ensure_ascii=False)
+                    + "\n"
+                )
+                error_count += 1
+
+    os.replace(output_file + ".tmp", output_file)
+    os.replace(error_file + ".tmp", error_file)
+    print(f"Combined {record_count} of {len(file_paths)} files into {output_file}")
+    if error_count:
+        print(f"{error_count} files were skipped, see {error_file}")
+    return record_count, error_count
 
 
-# Set the folder containing JSON files and the output file path
-input_folder = input("Enter the input folder:\n").strip('"')
-output_folder = input("\nEnter the output folder:\n").strip('"')
-output_file = os.path.join(output_folder, "combined.json")
+if __name__ == "__main__":
+    # Set the folder containing JSON files and the output file path
+    input_folder = input("Enter the input folder:\n").strip('"')
+    output_folder = input("\nEnter the output folder:\n").strip('"')
+    # impute_missing_value.py streams .ndjson files record by record
+    output_file = os.path.join(output_folder, "combined.ndjson")
 
-start_time = time.time()
+    start_time = time.time()
 
-combine_json_files(input_folder, output_file)
+    combine_json_files(input_folder, output_file)
 
-end_time = time.time()
-elapsed_time = end_time - start_time
-print(f"\nTime taken: {elapsed_time:.2f} seconds")
+    end_time = time.time()
+    elapsed_time = end_time - start_time
+    print(f"\nTime taken: {elapsed_time:.2f} seconds")
@@ -1,80 +1,298 @@
+import argparse
+import os
+import socket
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+from browser_pool import BrowserPool
+from html_cache import HtmlCache
+from page_parser import MissingFieldsError, missing_fields
+from rate_limiter import RateLimiter
+from scrape_metrics import ScrapeMetrics
+from scrape_queue import ScrapeQueue
 from web_scraping import WebScraping
 
+try:
+    from http_fetcher import AsyncFetcher
+except ImportError:  # aiohttp is only needed for --mode http
+    AsyncFetcher = None
 
-def scrape_site():
+OUTPUT_FOLDER = (
+    "C:/Users/ASUS/Desktop/Thames' Work/Data Science Project 2024/Web Scraping"
+)
+
+
+def scrape_document(scraper, pool, cache, doc_id, output_folder):
+    with pool.browser() as session:
+        browser = session.driver
+        scraper.load_page(browser, doc_id)
+
+        # Click cookies banner first if its in the way, it only shows once per session
+        if session.pages == 0:
+            scraper.click_cookies(browser)
+
+        # Scrape through information such as title, authors, year, institution, and location
+        title = scraper.find_title(browser)
+        date = scraper.find_date(browser)
+        authors, country_city_institution = scraper.find_author_institution_location(
+            browser
+        )
+        keywords = scraper.find_keyword(browser)
+
+        # Save the page with the author and keyword tabs open, for reparse_cache.py
+        with scraper.metrics.step("cache_write"):
+            cache.store(doc_id, scraper.page_html(browser), "browser")
+
+    # Outside the pool so a page with missing fields does not restart the browser
+    if country_city_institution is None:
+        raise MissingFieldsError("institution, city and country")
+    country, city, institution = country_city_institution
+
+    # Print out the results of the scrape
+    # labels = [
+    #     "Title",
+    #     "Date",
+    #     "Authors",
+    #     "Country",
+    #     "City",
+    #     "Institution,",
+    #     "Keywords",
+    # ]
+    # values = [title, date, authors, country, city, institution, keywords]
+    # print(
+    #     f"\nResults of {doc_id}: =================================================="
+    # )
+    # for label, value in zip(labels, values):
+    #     print(f"{label}: {value}")
+    print(f"Success on {doc_id}")
+
+    # Save data to json
+    scraper.pack_to_json(
+        title,
+        date,
+        authors,
+        country,
+        city,
+        institution,
+        keywords,
+        filename=os.path.join(output_folder, f"{doc_id}.json"),
+    )
+
+
+def scrape_and_record(scraper, queue, pool, cache, doc_id, output_folder):
+    """Scrape a claimed document in a browser and record the outcome in the queue."""
+    try:
+        scrape_document(scraper, pool, cache, doc_id, output_folder)
+    except MissingFieldsError as e:
+        print(f"Missing {e} on {doc_id}, the file is not saved")
+        queue.fail(doc_id, f"missing {e}", retry=False)
+        return False
+    except Exception as e:
+        # Handle errors and skip to the next document, it is retried later
+        print(f"Error occurred while processing {doc_id}: {e}")
+        queue.fail(doc_id, e)
+        return False
+    queue.complete(doc_id)
+    return True
+
+
+def fetch_documents(scraper, queue, cache, doc_ids, output_folder):
+    """Scrape the static HTML and return the documents that still need a browser."""
+    if AsyncFetcher is None:
+        raise ImportError("--mode http needs aiohttp, run: pip install aiohttp")
+    need_browser = []
+
+    def save_result(doc_id, html, record, error):
+        if html is not None:
+            with scraper.metrics.step("cache_write"):
+                cache.store(doc_id, html, "http")
+        if error is not None:
+            print(f"Fetch failed on {doc_id}, using the browser: {error}")
+            need_browser.append(doc_id)
+            return
+        missing = missing_fields(record)
+        if missing:
+            print(f"Missing {', '.join(missing)} on {doc_id}, using the browser")
+            need_browser.append(doc_id)
+            return
+        print(f"Success on {doc_id}")
+        scraper.pack_to_json(
+            **record, filename=os.path.join(output_folder, f"{doc_id}.json")
+        )
+        queue.complete(doc_id)
+
+    AsyncFetcher(scraper).run(doc_ids, save_result)
+    return need_browser
+
+
+def scrape_with_browsers(
+    scraper, queue, pool, cache, worker, output_folder, workers=4, doc_ids=None
+):
+    """Scrape the given claimed doc_ids, or claim documents until the queue is empty."""
+    lock = threading.Lock()
+    claimed = iter(doc_ids) if doc_ids is not None else None
+    scraped = [0]
+
+    def next_doc_id():
+        if claimed is None:
+            doc_ids = queue.claim_wait(worker)
+            return doc_ids[0] if doc_ids else None
+        with lock:
+            return next(claimed, None)
+
+    def run_worker():
+        while (doc_id := next_doc_id()) is not None:
+            if scrape_and_record(scraper, queue, pool, cache, doc_id, output_folder):
+                with lock:
+                    scraped[0] += 1
+
+    # Each worker reuses a browser from the pool instead of starting one per document
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(run_worker) for _ in range(workers)]:
+            future.result()
+    return scraped[0]
+
+
+def scrape_site(
+    mode="browser",
+    workers=4,
+    max_pages=50,
+    base_url=None,
+    limit=None,
+    output_folder=OUTPUT_FOLDER,
+    queue_path=None,
+    retry_failed=False,
+    batch_size=50,
+    max_rate=None,
+    cache_folder=None,
+    metrics_path=None,
+):
     scraper = WebScraping()
+    if base_url:
+        scraper.base_url = base_url.rstrip("/")
     scraper.calculate_loop()
+    # Stay under max_rate pages per second with at most 2 requests per worker in flight
+    scraper.rate_limiter = RateLimiter(
+        max_rate=max_rate or 1 / scraper.delay, max_concurrency=workers * 2
+    )
 
-    for doc_id in scraper.doc_id_list:
-        try:
-            browser = scraper.get_browser(doc_id)
+    # Written every 30 seconds while scraping, so a stalled run can be inspected
+    scraper.metrics = ScrapeMetrics(
+        metrics_path or os.path.join(output_folder, "scrape_metrics.json")
+    )
 
-            # Click cookies banner first if its in the way
-            scraper.click_cookies(browser)
+    # Reruns and other processes pick up where the queue left off
+    queue = ScrapeQueue(
+        queue_path or os.path.join(output_folder, "scrape_queue.sqlite")
+    )
+    queue.add(scraper.doc_id_list[:limit])
+    if retry_failed:
+        print(f"Retrying {queue.retry_failed()} failed documents")
+    print(f"Queue before scraping: {queue.counts()}")
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    cache = HtmlCache(cache_folder or os.path.join(output_folder, "html_cache"))
 
-            # Scrape through information such as title, authors, year, institution, and location
-            title = scraper.find_title(browser)
-            date = scraper.find_date(browser)
-            authors, country_city_institution = (
-                scraper.find_author_institution_location(browser)
-            )
-            country, city, institution = country_city_institution
-            keywords = scraper.find_keyword(browser)
-
-            # Print out the results of the scrape
-            # labels = [
-            #     "Title",
-            #     "Date",
-            #     "Authors",
-            #     "Country",
-            #     "City",
-            #     "Institution,",
-            #     "Keywords",
-            # ]
-            # values = [title, date, authors, country, city, institution, keywords]
-            # print(
-            #     f"\nResults of {doc_id}: =================================================="
-            # )
-            # for label, value in zip(labels, values):
-            #     print(f"{label}: {value}")
-            print(f"Success on {doc_id}")
-
-            browser.quit()
-
-            # Save data to json
-            scraper.pack_to_json(
-                title,
-                date,
-                authors,
-                country,
-                city,
-                institution,
-                keywords,
-                filename=f"C:/Users/ASUS/Desktop/Thames' Work/Data Science Project 2024/Web Scraping/{doc_id}.json",
+    scraped = 0
+    with BrowserPool(scraper.create_browser, size=workers, max_pages=max_pages) as pool:
+        if mode == "http":
+            # The HTTP mode only falls back to the browser when fields are missing
+            while doc_ids := queue.claim_wait(worker, count=batch_size):
+                need_browser = fetch_documents(
+                    scraper, queue, cache, doc_ids, output_folder
+                )
+                print(
+                    f"{len(need_browser)} of {len(doc_ids)} documents need the browser"
+                )
+                scraped += len(doc_ids) - len(need_browser)
+                if need_browser:
+                    scraped += scrape_with_browsers(
+                        scraper,
+                        queue,
+                        pool,
+                        cache,
+                        worker,
+                        output_folder,
+                        workers,
+                        need_browser,
+                    )
+        else:
+            scraped = scrape_with_browsers(
+                scraper, queue, pool, cache, worker, output_folder, workers
             )
 
-        except Exception as e:
-            # Handle errors and skip to the next iteration
-            print(f"Error occurred while processing {doc_id}: {e}")
+    print(
+        f"Browsers started: {pool.started}, recycled: {pool.recycled}, "
+        f"restarted after a crash: {pool.crashed}"
+    )
+    scraper.rate_limiter.print_stats()
+    scraper.metrics.export()
+    scraper.metrics.print_summary()
+    print(f"Queue after scraping: {queue.counts()}")
+    queue.close()
+    cache.close()
+    return scraped
+
 
-        finally:
-            # Ensure the browser is closed even if an error occurs
-            try:
-                browser.quit()
-            except Exception:
-                pass
+def main():
+    parser = argparse.ArgumentParser(description="Scrape documents from IEEE Xplore.")
+    parser.add_argument(
+        "--mode",
+        choices=["browser", "http"],
+        default="browser",
+        help="http parses the static HTML and only opens a browser for missing fields",
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--max-pages", type=int, default=50, help="Pages before a browser restarts"
+    )
+    parser.add_argument("--base-url", help="e.g. the address of fixture_server.py")
+    parser.add_argument("--limit", type=int, help="Only scrape the first documents")
+    parser.add_argument("--output", default=OUTPUT_FOLDER)
+    parser.add_argument(
+        "--max-rate",
+        type=float,
+        help="Most page loads per second, defaults to one every delay seconds",
+    )
+    parser.add_argument(
+        "--queue", help="Queue file, defaults to scrape_queue.sqlite in the output"
+    )
+    parser.add_argument(
+        "--cache", help="HTML cache folder, defaults to html_cache in the output"
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Step metrics JSON file, defaults to scrape_metrics.json in the output",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Retry the documents that ran out of attempts",
+    )
+    args = parser.parse_args()
 
-        # Rate limiting
-        time.sleep(scraper.delay)
+    start_time = time.time()
+    print("Start scraping! ==================================================")
 
+    documents = scrape_site(
+        mode=args.mode,
+        workers=args.workers,
+        max_pages=args.max_pages,
+        base_url=args.base_url,
+        limit=args.limit,
+        output_folder=args.output,
+        queue_path=args.queue,
+        retry_failed=args.retry_failed,
+        max_rate=args.max_rate,
+        cache_folder=args.cache,
+        metrics_path=args.metrics,
+    )
 
-start_time = time.time()
-print("Start scraping! ==================================================")
+    end_time = time.time()
+    elapsed_time = end_time - start_time
+    print(f"\nTime taken: {elapsed_time:.2f} seconds")
+    print(f"Documents scraped per hour: {documents / elapsed_time * 3600:.0f}")
 
-scrape_site()
 
-end_time = time.time()
-elapsed_time = end_time - start_time
-print(f"\nTime taken: {elapsed_time:.2f} seconds")
+if __name__ == "__main__":
+    main()
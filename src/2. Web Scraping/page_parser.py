@@ -0,0 +1,212 @@
+import json
+import re
+from datetime import datetime
+
+try:
+    import lxml.html
+except ImportError:  # Without lxml only the embedded metadata of cached pages is read
+    lxml = None
+
+# IEEE Xplore embeds the document metadata as JSON in a script tag
+METADATA_PATTERN = re.compile(r"xplGlobal\.document\.metadata\s*=\s*")
+OG_TITLE_PATTERN = re.compile(
+    r'<meta\s+property="og:title"\s+content="([^"]*)"', re.IGNORECASE
+)
+# The date can be null, like in the browser scrape
+REQUIRED_FIELDS = ("title", "authors", "country", "city", "institution", "keywords")
+
+# The fields save_record writes and their types, None is allowed unless required
+RECORD_FIELDS = {
+    "Title": str,
+    "Authors": list,
+    "Date": str,
+    "Institution": list,
+    "City": list,
+    "Country": list,
+    "Keywords": list,
+}
+REQUIRED_RECORD_FIELDS = ("Title", "Institution", "City", "Country")
+
+# The XPaths of WebScraping, shared so the offline re-parse runs the same extractors
+TITLE_XPATH = "//h1[contains(@class, 'document-title')]//span"
+DATE_XPATH = "//div[contains(@class, 'doc-abstract-dateadded')]"
+AUTHORS_XPATH = "//div[contains(@class, 'author-card')]//a/span"
+INSTITUTION_XPATH = "//div[contains(@class, 'author-card')]//div[not(@class)]"
+KEYWORDS_XPATH = (
+    "//ul[contains(@class, 'List--no-style')]"
+    "//a[contains(@class, 'stats-keywords-list-item')]"
+)
+
+
+def find_metadata(html):
+    """The embedded metadata JSON of a document page, or None."""
+    match = METADATA_PATTERN.search(html)
+    if match is None:
+        return None
+    try:
+        metadata, _ = json.JSONDecoder().raw_decode(html, match.end())
+    except json.JSONDecodeError:
+        return None
+    return metadata if isinstance(metadata, dict) else None
+
+
+def parse_date(text):
+    """Turn "Date Added to IEEE Xplore: 09 January 2023" into "2023-01-09"."""
+    try:
+        string_date = " ".join(text.strip().split()[-3:])
+        return datetime.strptime(string_date, "%d %B %Y").strftime("%Y-%m-%d")
+    except (AttributeError, ValueError):
+        return None
+
+
+def split_affiliations(affiliations):
+    """Split "Institution, City, Country" texts like the browser scrape does."""
+    parts = [
+        tuple(map(str.strip, affiliation.split(",")[-3:]))
+        for affiliation in dict.fromkeys(affiliations)
+        if affiliation.strip()
+    ]
+    parts = [part for part in parts if len(part) == 3]
+    if not parts:
+        return None, None, None
+    institution, city, country = zip(*parts)
+    return (
+        list(dict.fromkeys(country)),
+        list(dict.fromkeys(city)),
+        list(dict.fromkeys(institution)),
+    )
+
+
+def parse_page(html):
+    """Parse the fields of pack_to_json from the static HTML of a document page."""
+    metadata = find_metadata(html) or {}
+
+    title = metadata.get("title") or metadata.get("displayDocTitle")
+    if not title:
+        match = OG_TITLE_PATTERN.search(html)
+        title = match.group(1) if match else None
+
+    authors = [
+        author["name"]
+        for author in metadata.get("authors", [])
+        if author.get("name", "").strip()
+    ]
+    affiliations = [
+        affiliation
+        for author in metadata.get("authors", [])
+        for affiliation in author.get("affiliation", [])
+    ]
+    country, city, institution = split_affiliations(affiliations)
+
+    keywords = list(
+        dict.fromkeys(
+            keyword.strip()
+            for group in metadata.get("keywords", [])
+            for keyword in group.get("kwd", [])
+            if keyword.strip()
+        )
+    )
+
+    return {
+        "title": title.strip() if title else None,
+        "date": parse_date(metadata.get("dateOfInsertion")),
+        "authors": authors or None,
+        "country": country,
+        "city": city,
+        "institution": institution,
+        "keywords": keywords or None,
+    }
+
+
+def parse_rendered_page(html):
+    """Run the browser XPaths over the rendered HTML a browser saved to the cache."""
+    tree = lxml.html.fromstring(html)
+
+    def texts(xpath):
+        return [
+            " ".join(element.text_content().split()) for element in tree.xpath(xpath)
+        ]
+
+    titles = [title for title in texts(TITLE_XPATH) if title]
+    dates = texts(DATE_XPATH)
+    # Every second div of an author card is the affiliation, like in the browser scrape
+    affiliations = [
+        text for i, text in enumerate(texts(INSTITUTION_XPATH)) if text and i % 2 != 0
+    ]
+    country, city, institution = split_affiliations(affiliations)
+    keywords = list(
+        dict.fromkeys(keyword for keyword in texts(KEYWORDS_XPATH) if keyword)
+    )
+
+    return {
+        "title": titles[0] if titles else None,
+        "date": parse_date(dates[0]) if dates else None,
+        "authors": [author for author in texts(AUTHORS_XPATH) if author] or None,
+        "country": country,
+        "city": city,
+        "institution": institution,
+        "keywords": keywords or None,
+    }
+
+
+def parse_cached_page(html):
+    """Parse a cached page, the XPaths first so a fix to them reaches the whole cache."""
+    if lxml is None:
+        return parse_page(html)
+    record = parse_rendered_page(html)
+    # Pages fetched over HTTP are not rendered, the embedded metadata fills the gaps
+    for field, value in parse_page(html).items():
+        if not record[field]:
+            record[field] = value
+    return record
+
+
+def save_record(record, filename):
+    """Write a record as the per-document JSON file of the scraper."""
+    data = {
+        "Title": record["title"],
+        "Authors": record["authors"],
+        "Date": record["date"],
+        "Institution": record["institution"],
+        "City": record["city"],
+        "Country": record["country"],
+        "Keywords": record["keywords"],
+    }
+    with open(filename, "w", encoding="utf-8") as json_file:
+        json.dump(data, json_file, ensure_ascii=False, indent=4)
+
+
+def validate_record(data):
+    """List what is wrong with a per-document JSON file, empty if it is valid."""
+    if not isinstance(data, dict):
+        return [f"expected an object, got {type(data).__name__}"]
+
+    errors = []
+    for field, field_type in RECORD_FIELDS.items():
+        if field not in data:
+            errors.append(f"missing {field}")
+            continue
+        value = data[field]
+        if value is None:
+            if field in REQUIRED_RECORD_FIELDS:
+                errors.append(f"{field} is null")
+        elif not isinstance(value, field_type):
+            errors.append(f"{field} should be a {field_type.__name__}")
+        elif field_type is list and not all(isinstance(item, str) for item in value):
+            errors.append(f"{field} should only hold strings")
+
+    date = data.get("Date")
+    if isinstance(date, str):
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            errors.append(f"Date {date!r} is not YYYY-MM-DD")
+    return errors
+
+
+def missing_fields(record):
+    return [field for field in REQUIRED_FIELDS if not record.get(field)]
+
+
+class MissingFieldsError(Exception):
+    """A page was scraped but lacks fields, retrying it will not help."""
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+
+class RateLimiter:
+    """Token bucket with a concurrency cap that slows down on slow responses or errors."""
+
+    def __init__(
+        self,
+        max_rate=0.5,
+        min_rate=0.05,
+        burst=1,
+        max_concurrency=8,
+        slow_seconds=10,
+        increase=0.1,
+        decrease=0.5,
+    ):
+        # Requests per second never go above max_rate, the politeness ceiling
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate = max_rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        # A response slower than this counts like an error
+        self.slow_seconds = slow_seconds
+        # Each good response adds increase * max_rate, each bad one multiplies by decrease
+        self.increase = increase
+        self.decrease = decrease
+
+        self.lock = threading.Lock()
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.async_slots = None
+
+        self.requests = 0
+        self.errors = 0
+        self.slowdowns = 0
+        self.total_wait = 0.0
+        self.waits = deque(maxlen=1000)
+
+    def reserve(self):
+        """Take a token and return how long to wait until it is valid."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            # Negative tokens are requests already waiting in line
+            self.tokens -= 1
+            wait = max(0.0, -self.tokens / self.rate)
+            self.requests += 1
+            self.total_wait += wait
+            self.waits.append(wait)
+        return wait
+
+    def record(self, latency, error=False):
+        """Adapt the rate to how the server answered."""
+        with self.lock:
+            if error:
+                self.errors += 1
+            if error or latency > self.slow_seconds:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self.slowdowns += 1
+            else:
+                self.rate = min(
+                    self.max_rate, self.rate + self.increase * self.max_rate
+                )
+
+    @contextmanager
+    def request(self):
+        """Wait for a slot and a token, then time the request in the with block."""
+        with self.slots:
+            time.sleep(self.reserve())
+            start = time.monotonic()
+            try:
+                yield
+            except Exception:
+                self.record(time.monotonic() - start, error=True)
+                raise
+            self.record(time.monotonic() - start)
+
+    @asynccontextmanager
+    async def request_async(self):
+        """The asyncio version of request."""
+        # asyncio semaphores belong to one event loop, every asyncio.run gets its own
+        loop = asyncio.get_running_loop()
+        if self.async_slots is None or self.async_slots[0] is not loop:
+            self.async_slots = (loop, asyncio.Semaphore(self.max_concurrency))
+        async with self.async_slots[1]:
+            await asyncio.sleep(self.reserve())
+            start = time.monotonic()
+            try:
+                yield
+            except Exception:
+                self.record(time.monotonic() - start, error=True)
+                raise
+            self.record(time.monotonic() - start)
+
+    def stats(self):
+        with self.lock:
+            waits = sorted(self.waits)
+            return {
+                "rate": self.rate,
+                "requests": self.requests,
+                "errors": self.errors,
+                "slowdowns": self.slowdowns,
+                "mean_wait": self.total_wait / self.requests if self.requests else 0.0,
+                "p95_wait": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "max_wait": waits[-1] if waits else 0.0,
+            }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(
+            f"Rate limiter: {stats['rate']:.2f} requests/sec now, "
+            f"{stats['requests']} requests, {stats['errors']} errors, "
+            f"{stats['slowdowns']} slowdowns, wait mean {stats['mean_wait']:.2f}s "
+            f"p95 {stats['p95_wait']:.2f}s max {stats['max_wait']:.2f}s"
+        )
@@ -0,0 +1,86 @@
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from html_cache import HtmlCache, read_page
+from page_parser import lxml, missing_fields, parse_cached_page, save_record
+
+
+def reparse_pages(pages, output_folder):
+    """Parse a chunk of cached pages and save them, returning their missing fields.
+
+    A page that cannot be read or parsed is returned with its error instead, so one
+    broken page does not stop the rest of the chunk.
+    """
+    results = []
+    for doc_id, object_path in pages:
+        try:
+            record = parse_cached_page(read_page(object_path))
+        except Exception as e:
+            # E.g. a truncated gzip object or an empty page lxml cannot parse
+            results.append((doc_id, [], False, f"{type(e).__name__}: {e}"))
+            continue
+        missing = missing_fields(record)
+        # Like the browser scrape, pages without institutions are not saved
+        if record["institution"]:
+            save_record(record, os.path.join(output_folder, f"{doc_id}.json"))
+        results.append((doc_id, missing, bool(record["institution"]), None))
+    return results
+
+
+def reparse_cache(cache_folder, output_folder, workers=os.cpu_count(), chunk_size=200):
+    """Re-extract every cached page without a browser, in parallel."""
+    cache = HtmlCache(cache_folder)
+    pages = cache.pages()
+    cache.close()
+    os.makedirs(output_folder, exist_ok=True)
+
+    chunks = [pages[i : i + chunk_size] for i in range(0, len(pages), chunk_size)]
+    saved = 0
+    missing_counts = Counter()
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for results in executor.map(
+            reparse_pages, chunks, [output_folder] * len(chunks)
+        ):
+            for doc_id, missing, was_saved, error in results:
+                if error is not None:
+                    failed.append((doc_id, error))
+                    continue
+                saved += was_saved
+                missing_counts.update(missing)
+
+    print(f"Saved {saved} of {len(pages)} cached pages to {output_folder}")
+    for field, count in missing_counts.most_common():
+        print(f"Missing {field}: {count}")
+    if failed:
+        print(f"\n{len(failed)} cached pages could not be parsed:")
+        for doc_id, error in failed:
+            print(f"{doc_id}: {error}")
+    return len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-run the extractors over the HTML cache without a browser."
+    )
+    parser.add_argument("cache", help="The html_cache folder of a scrape")
+    parser.add_argument("output", help="Folder for the re-extracted JSON files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if lxml is None:
+        print("lxml is not installed, only the embedded metadata will be read")
+
+    start_time = time.time()
+    pages = reparse_cache(args.cache, args.output, workers=args.workers)
+    elapsed_time = time.time() - start_time
+    print(f"\nTime taken: {elapsed_time:.2f} seconds")
+    if elapsed_time:
+        print(f"Pages per second: {pages / elapsed_time:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the latency histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, float("inf"))
+
+
+def is_timeout(error):
+    # Selenium raises TimeoutException, aiohttp and asyncio raise TimeoutError
+    return isinstance(error, TimeoutError) or "Timeout" in type(error).__name__
+
+
+def failure_reason(error):
+    """A short reason to group failures by, Selenium messages can be pages long."""
+    # HTTP errors carry the URL in their message, group them by status instead
+    if isinstance(getattr(error, "status", None), int):
+        return f"{type(error).__name__}: {error.status} {getattr(error, 'message', '')}"
+    lines = str(error).strip().splitlines()
+    return (
+        f"{type(error).__name__}: {lines[0][:100]}" if lines else type(error).__name__
+    )
+
+
+class StepStats:
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * len(BUCKETS)
+        self.reasons = Counter()
+
+    def percentile(self, fraction):
+        """The bucket bound below which this fraction of the calls finished."""
+        target = fraction * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS, self.histogram):
+            seen += count
+            if seen >= target and count:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "ok": self.calls - self.failures,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.calls if self.calls else 0.0,
+            "p50_seconds": self.percentile(0.5),
+            "p95_seconds": self.percentile(0.95),
+            "max_seconds": self.max,
+            "histogram": {
+                f"le_{bound}": count for bound, count in zip(BUCKETS, self.histogram)
+            },
+            "reasons": dict(self.reasons.most_common()),
+        }
+
+
+class ScrapeMetrics:
+    """Latency histograms, timeouts and failure reasons of every scraper step."""
+
+    def __init__(self, export_path=None, export_every=30):
+        # The metrics are written to this JSON file every export_every seconds
+        self.export_path = export_path
+        self.export_every = export_every
+        self.lock = threading.Lock()
+        self.steps = {}
+        self.started = time.time()
+        self.last_export = time.monotonic()
+
+    def stats(self, name):
+        if name not in self.steps:
+            self.steps[name] = StepStats()
+        return self.steps[name]
+
+    @contextmanager
+    def step(self, name):
+        """Time the with block as one call of a step, an exception marks it failed."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.record(name, time.perf_counter() - start)
+            self.fail(name, e)
+            raise
+        self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.lock:
+            stats = self.stats(name)
+            stats.calls += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.histogram[next(i for i, b in enumerate(BUCKETS) if seconds <= b)] += 1
+        self.export_if_due()
+
+    def fail(self, name, error):
+        """Count a failure of a step, also for errors the scraper catches itself."""
+        with self.lock:
+            stats = self.stats(name)
+            stats.failures += 1
+            stats.timeouts += is_timeout(error)
+            stats.reasons[failure_reason(error)] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "started": self.started,
+                "elapsed_seconds": time.time() - self.started,
+                "steps": {name: stats.as_dict() for name, stats in self.steps.items()},
+            }
+
+    def export(self):
+        """Write the metrics as JSON, through a temporary file so readers never see half."""
+        if self.export_path is None:
+            return
+        temp_path = f"{self.export_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=4)
+        os.replace(temp_path, self.export_path)
+
+    def export_if_due(self):
+        with self.lock:
+            if time.monotonic() - self.last_export < self.export_every:
+                return
+            self.last_export = time.monotonic()
+        self.export()
+
+    def print_summary(self):
+        steps = self.snapshot()["steps"]
+        print(
+            f"\n{'Step':<22}{'Calls':>7}{'Failed':>8}{'Timeouts':>10}"
+            f"{'Mean s':>9}{'p95 s':>9}{'Max s':>9}{'Total s':>10}"
+        )
+        for name, stats in sorted(
+            steps.items(), key=lambda item: -item[1]["total_seconds"]
+        ):
+            print(
+                f"{name:<22}{stats['calls']:>7}{stats['failures']:>8}"
+                f"{stats['timeouts']:>10}{stats['mean_seconds']:>9.2f}"
+                f"{stats['p95_seconds']:>9.2f}{stats['max_seconds']:>9.2f}"
+                f"{stats['total_seconds']:>10.1f}"
+            )
+            for reason, count in list(stats["reasons"].items())[:3]:
+                print(f"    {count} x {reason}")
+
+
+def instrumented(name):
+    """Time a WebScraping method as a step of its self.metrics."""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.step(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
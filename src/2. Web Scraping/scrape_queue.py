@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+import time
+
+
+class ScrapeQueue:
+    """A persistent doc_id work queue that several scraper processes can share."""
+
+    def __init__(self, queue_path, max_attempts=3, backoff=30, lease_seconds=600):
+        self.queue_path = queue_path
+        # A document fails for good after this many attempts
+        self.max_attempts = max_attempts
+        # Seconds before the first retry, doubled after every further failure
+        self.backoff = backoff
+        # Claims of a process that crashed are handed out again after this long
+        self.lease_seconds = lease_seconds
+
+        # One connection per process, shared by its worker threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            queue_path, timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id INTEGER PRIMARY KEY,
+                position INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                worker TEXT,
+                leased_until REAL,
+                error TEXT
+            )
+            """
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS documents_state "
+            "ON documents(state, next_attempt)"
+        )
+
+    def add(self, doc_ids):
+        """Queue new doc_ids, the state of known ones is kept so reruns resume."""
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO documents (doc_id, position) VALUES (?, ?)",
+                [(doc_id, position) for position, doc_id in enumerate(doc_ids)],
+            )
+            self.connection.execute("COMMIT")
+
+    def claim(self, worker, count=1):
+        """Hand out up to count due documents that no other worker holds."""
+        now = time.time()
+        with self.lock:
+            # IMMEDIATE takes the write lock, so two processes never claim the same row
+            self.connection.execute("BEGIN IMMEDIATE")
+            doc_ids = [
+                doc_id
+                for (doc_id,) in self.connection.execute(
+                    "SELECT doc_id FROM documents "
+                    "WHERE (state = 'pending' AND next_attempt <= ?) "
+                    "OR (state = 'running' AND leased_until < ?) "
+                    "ORDER BY position LIMIT ?",
+                    (now, now, count),
+                )
+            ]
+            self.connection.executemany(
+                "UPDATE documents SET state = 'running', worker = ?, leased_until = ? "
+                "WHERE doc_id = ?",
+                [(worker, now + self.lease_seconds, doc_id) for doc_id in doc_ids],
+            )
+            self.connection.execute("COMMIT")
+        return doc_ids
+
+    def next_retry(self):
+        """When the next backed-off document is due, or None if none are waiting."""
+        with self.lock:
+            (next_attempt,) = self.connection.execute(
+                "SELECT MIN(next_attempt) FROM documents WHERE state = 'pending'"
+            ).fetchone()
+        return next_attempt
+
+    def claim_wait(self, worker, count=1):
+        """Claim documents, sleeping through the backoff of failed ones if needed."""
+        while True:
+            doc_ids = self.claim(worker, count)
+            if doc_ids:
+                return doc_ids
+            next_attempt = self.next_retry()
+            if next_attempt is None:
+                return []
+            time.sleep(max(0.0, next_attempt - time.time()) + 0.1)
+
+    def complete(self, doc_id):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE documents SET state = 'done', leased_until = NULL, error = NULL "
+                "WHERE doc_id = ?",
+                (doc_id,),
+            )
+
+    def fail(self, doc_id, error, retry=True):
+        """Record a failure, the document is retried with backoff until max_attempts."""
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            (attempts,) = self.connection.execute(
+                "SELECT attempts FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+            attempts += 1
+            if retry and attempts < self.max_attempts:
+                state = "pending"
+                next_attempt = time.time() + self.backoff * 2 ** (attempts - 1)
+            else:
+                state = "failed"
+                next_attempt = 0
+            self.connection.execute(
+                "UPDATE documents SET state = ?, attempts = ?, next_attempt = ?, "
+                "leased_until = NULL, error = ? WHERE doc_id = ?",
+                (state, attempts, next_attempt, str(error), doc_id),
+            )
+            self.connection.execute("COMMIT")
+
+    def retry_failed(self):
+        """Give the documents that failed for good a fresh set of attempts."""
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE documents SET state = 'pending', attempts = 0, next_attempt = 0 "
+                "WHERE state = 'failed'"
+            )
+        return cursor.rowcount
+
+    def counts(self):
+        with self.lock:
+            return dict(
+                self.connection.execute(
+                    "SELECT state, COUNT(*) FROM documents GROUP BY state"
+                )
+            )
+
+    def close(self):
+        self.connection.close()
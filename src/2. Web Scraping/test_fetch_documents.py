@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from fixture_server import FixtureServer
+from html_cache import HtmlCache
+from main import fetch_documents
+from page_parser import missing_fields, parse_page
+from rate_limiter import RateLimiter
+from scrape_queue import ScrapeQueue
+from web_scraping import WebScraping
+
+FIXTURE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Metadata of the wrong shape, the authors are plain strings
+BAD_METADATA_ID = 1
+BAD_METADATA_PAGE = (
+    '<html><script>xplGlobal.document.metadata={"title": "Broken", '
+    '"authors": ["Jane Doe"]};</script></html>'
+)
+# Served as UTF-8 but it is not
+BAD_ENCODING_ID = 2
+BAD_ENCODING_PAGE = b"<html><title>\xff\xfe broken</title></html>"
+# Not in the fixture folder, the server answers 404
+MISSING_ID = 3
+
+
+class FetchDocumentsTest(unittest.TestCase):
+    """fetch_documents against fixture_server.py, with a few broken pages mixed in."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.fixture_folder = os.path.join(self.folder, "fixtures")
+        self.output_folder = os.path.join(self.folder, "output")
+        shutil.copytree(FIXTURE_FOLDER, self.fixture_folder)
+        os.makedirs(self.output_folder)
+        with open(
+            os.path.join(self.fixture_folder, f"{BAD_METADATA_ID}.html"),
+            "w",
+            encoding="utf-8",
+        ) as f:
+            f.write(BAD_METADATA_PAGE)
+        with open(
+            os.path.join(self.fixture_folder, f"{BAD_ENCODING_ID}.html"), "wb"
+        ) as f:
+            f.write(BAD_ENCODING_PAGE)
+
+        self.fixture_ids = sorted(
+            int(name[:-5])
+            for name in os.listdir(FIXTURE_FOLDER)
+            if name.endswith(".html")
+        )
+        self.doc_ids = self.fixture_ids + [BAD_METADATA_ID, BAD_ENCODING_ID, MISSING_ID]
+        self.queue = ScrapeQueue(os.path.join(self.folder, "scrape_queue.sqlite"))
+        self.queue.add(self.doc_ids)
+        self.queue.claim("test", count=len(self.doc_ids))
+        self.cache = HtmlCache(os.path.join(self.folder, "html_cache"))
+
+    def tearDown(self):
+        self.queue.close()
+        self.cache.close()
+        shutil.rmtree(self.folder)
+
+    def fetch(self):
+        scraper = WebScraping()
+        # The local server needs no politeness delay
+        scraper.rate_limiter = RateLimiter(max_rate=1000, burst=10)
+        with FixtureServer(self.fixture_folder) as server:
+            scraper.base_url = server.base_url
+            return fetch_documents(
+                scraper, self.queue, self.cache, self.doc_ids, self.output_folder
+            )
+
+    def test_broken_pages_go_to_the_browser(self):
+        need_browser = self.fetch()
+
+        complete = []
+        for doc_id in self.fixture_ids:
+            with open(
+                os.path.join(FIXTURE_FOLDER, f"{doc_id}.html"), encoding="utf-8"
+            ) as f:
+                if not missing_fields(parse_page(f.read())):
+                    complete.append(doc_id)
+        self.assertTrue(complete)
+
+        # The broken pages did not stop the rest of the batch
+        self.assertCountEqual(need_browser, sorted(set(self.doc_ids) - set(complete)))
+        for doc_id in complete:
+            self.assertTrue(
+                os.path.exists(os.path.join(self.output_folder, f"{doc_id}.json"))
+            )
+        self.assertEqual(self.queue.counts().get("done"), len(complete))
+
+        # A page that could not be parsed is still cached for reparse_cache.py
+        self.assertIsNotNone(self.cache.load(BAD_METADATA_ID))
+        self.assertIsNone(self.cache.load(BAD_ENCODING_ID))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,3 @@
-import json
 from datetime import datetime
 
 from selenium import webdriver
@@ -6,6 +5,17 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+from page_parser import (
+    AUTHORS_XPATH,
+    DATE_XPATH,
+    INSTITUTION_XPATH,
+    KEYWORDS_XPATH,
+    TITLE_XPATH,
+    save_record,
+)
+from rate_limiter import RateLimiter
+from scrape_metrics import ScrapeMetrics, instrumented
+
 
 # title, author, years, institution, location, keyword
 class WebScraping:
@@ -13,6 +23,9 @@ class WebScraping:
         # scrape_site(self):
         self.delay = 2
 
+        # create_url(self):
+        self.base_url = "https://ieeexplore.ieee.org"
+
         # calculate_loop(self):
         self.start = 10350001
         self.end = 10700001
@@ -22,6 +35,15 @@ class WebScraping:
         self.html = None
         self.browser = None
 
+        # load_page(self): at most one page load every self.delay seconds
+        self.rate_limiter = RateLimiter(max_rate=1 / self.delay)
+
+        # How long to wait for buttons to become clickable
+        self.wait_timeout = 2
+
+        # Latency and failures of every step below
+        self.metrics = ScrapeMetrics()
+
     # Generate a list of evenly spaced values from Start to End with Num_iterations steps.
     def calculate_loop(self):
         step = (self.end - self.start) // self.num_iterations
@@ -30,44 +52,53 @@ class WebScraping:
 
     # Create link to be turned into soups
     def create_url(self, doc_id):
-        return f"https://ieeexplore.ieee.org/document/{doc_id}"
+        return f"{self.base_url}/document/{doc_id}"
 
-    def get_browser(self, doc_id):
-        url = self.create_url(doc_id=doc_id)
+    @instrumented("driver_launch")
+    def create_browser(self):
         chrome_options = webdriver.ChromeOptions()
         chrome_options.add_argument("--window-size=1920,1080")
-        self.browser = webdriver.Chrome(options=chrome_options)
-        self.browser.get(url)
-        self.html = self.browser.execute_script(
-            "return document.documentElement.outerHTML"
-        )
+        return webdriver.Chrome(options=chrome_options)
+
+    # Load a document in an open browser and return its HTML
+    def load_page(self, browser, doc_id):
+        with self.rate_limiter.request(), self.metrics.step("page_load"):
+            browser.get(self.create_url(doc_id=doc_id))
+            return self.page_html(browser)
+
+    def page_html(self, browser):
+        return browser.execute_script("return document.documentElement.outerHTML")
+
+    def get_browser(self, doc_id):
+        self.browser = self.create_browser()
+        self.html = self.load_page(self.browser, doc_id)
         return self.browser
 
+    @instrumented("cookie_click")
     def click_cookies(self, browser):
         try:
-            consent_button = WebDriverWait(browser, self.delay).until(
+            consent_button = WebDriverWait(browser, self.wait_timeout).until(
                 EC.element_to_be_clickable((By.ID, "cookieConsentButtonID"))
             )
             consent_button.click()
-        except:
+        except Exception as e:
             # print("Cookie consent button not found or not needed.")
-            pass
+            self.metrics.fail("cookie_click", e)
 
+    @instrumented("extract_title")
     def find_title(self, browser):
         try:
-            title_element = browser.find_element(
-                By.XPATH, "//h1[contains(@class, 'document-title')]//span"
-            )
+            title_element = browser.find_element(By.XPATH, TITLE_XPATH)
             title = title_element.text.strip()
             return title
         except Exception as e:
             print("Error extracting title:", e)
+            self.metrics.fail("extract_title", e)
 
+    @instrumented("extract_date")
     def find_date(self, browser):
         try:
-            date_added_element = browser.find_element(
-                By.XPATH, "//div[contains(@class, 'doc-abstract-dateadded')]"
-            )
+            date_added_element = browser.find_element(By.XPATH, DATE_XPATH)
             # Extract the date string
             string_date = " ".join(date_added_element.text.strip().split()[-3:])
 
@@ -80,6 +111,7 @@ class WebScraping:
             return formatted_date
         except Exception as e:
             print("Error extracting date:", e)
+            self.metrics.fail("extract_date", e)
 
     def find_author_institution_location(self, browser):
         authors = self.__find_authors(browser)
@@ -89,30 +121,33 @@ class WebScraping:
     def __find_authors(self, browser):
         try:
             # Find and click the authors button
-            authors_button = WebDriverWait(browser, self.delay).until(
-                EC.element_to_be_clickable((By.ID, "authors"))
-            )
-            browser.execute_script("arguments[0].scrollIntoView(true);", authors_button)
-            authors_button.click()
-            browser.implicitly_wait(self.delay)
-
-            # Scrape authors
-            author_elements = browser.find_elements(
-                By.XPATH, "//div[contains(@class, 'author-card')]//a/span"
-            )
-            author_names = [
-                author.text for author in author_elements if author.text.strip() != ""
-            ]
+            with self.metrics.step("authors_tab"):
+                authors_button = WebDriverWait(browser, self.wait_timeout).until(
+                    EC.element_to_be_clickable((By.ID, "authors"))
+                )
+                browser.execute_script(
+                    "arguments[0].scrollIntoView(true);", authors_button
+                )
+                authors_button.click()
+                browser.implicitly_wait(self.wait_timeout)
+
+            # Scrape authors, the implicit wait above is spent here
+            with self.metrics.step("extract_authors"):
+                author_elements = browser.find_elements(By.XPATH, AUTHORS_XPATH)
+                author_names = [
+                    author.text
+                    for author in author_elements
+                    if author.text.strip() != ""
+                ]
             return author_names
         except Exception as e:
             print("Error extracting authors:", e)
 
+    @instrumented("extract_institution")
     def __find_institution_and_location(self, browser):
         try:
             # Find the institution and add it to a list
-            institution_elements = browser.find_elements(
-                By.XPATH, "//div[contains(@class, 'author-card')]//div[not(@class)]"
-            )
+            institution_elements = browser.find_elements(By.XPATH, INSTITUTION_XPATH)
             seen_institutions = set()
             institution_texts = [
                 institution.text.strip()
@@ -138,49 +173,49 @@ class WebScraping:
 
         except Exception as e:
             print("Error extracting institution/organization:", e)
+            self.metrics.fail("extract_institution", e)
 
     def find_keyword(self, browser):
         try:
             # Find and click the keywords button
-            keywords_button = WebDriverWait(browser, self.delay).until(
-                EC.element_to_be_clickable((By.ID, "keywords"))
-            )
-            browser.execute_script(
-                "arguments[0].scrollIntoView(true);", keywords_button
-            )
-            keywords_button.click()
+            with self.metrics.step("keywords_tab"):
+                keywords_button = WebDriverWait(browser, self.wait_timeout).until(
+                    EC.element_to_be_clickable((By.ID, "keywords"))
+                )
+                browser.execute_script(
+                    "arguments[0].scrollIntoView(true);", keywords_button
+                )
+                keywords_button.click()
 
             # Scrape keywords
-            keywords_elements = browser.find_elements(
-                By.XPATH,
-                "//ul[contains(@class, 'List--no-style')]//a[contains(@class, 'stats-keywords-list-item')]",
-            )
-            keywords = [
-                keyword.text.strip()
-                for keyword in keywords_elements
-                if keyword.text.strip()
-            ]
-            keywords = list(set(keywords))
+            with self.metrics.step("extract_keywords"):
+                keywords_elements = browser.find_elements(By.XPATH, KEYWORDS_XPATH)
+                keywords = [
+                    keyword.text.strip()
+                    for keyword in keywords_elements
+                    if keyword.text.strip()
+                ]
+                keywords = list(set(keywords))
             return keywords
 
         except Exception as e:
             print("Error while scraping keywords:", e)
 
+    @instrumented("json_write")
     def pack_to_json(
         self, title, date, authors, country, city, institution, keywords, filename
     ):
-        data = {
-            "Title": title,
-            "Authors": authors,
-            "Date": date,
-            "Institution": institution,
-            "City": city,
-            "Country": country,
-            "Keywords": keywords,
+        record = {
+            "title": title,
+            "authors": authors,
+            "date": date,
+            "institution": institution,
+            "city": city,
+            "country": country,
+            "keywords": keywords,
         }
 
         # Write the data to the JSON file
-        with open(filename, "w", encoding="utf-8") as json_file:
-            json.dump(data, json_file, ensure_ascii=False, indent=4)
+        save_record(record, filename)
 
         print(f"Data saved to {filename}")
@@ -1,30 +1,119 @@
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-import pandas as pd
+import numpy as np
 
-# Define the folder path where your CSV files are stored
-folder_path = (
-    "C:/Users/ASUS/Desktop/Thames' Work/Data Science Project 2024/Imputed Data"
+# Shared helpers from Data Prep
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "1. Data Prep")
 )
+from remove_duplicates import normalise_title, title_digest
+from table_io import TableWriter, iter_table, table_columns
 
-# Initialize an empty list to collect data from each CSV file
-csv_files = []
 
-# Iterate through all the files in the folder
-for filename in os.listdir(folder_path):
-    # Check if the file is a CSV file
-    if filename.endswith(".csv"):
-        file_path = os.path.join(folder_path, filename)
-        # Read the CSV file and append it to the list
-        csv_files.append(pd.read_csv(file_path))
+def title_digests(titles):
+    """The 64-bit digest of every normalised title."""
+    return np.array(
+        [
+            int.from_bytes(title_digest(normalise_title(title)), "little")
+            for title in titles
+        ],
+        dtype=np.uint64,
+    )
 
-# Concatenate all dataframes in the list into a single dataframe
-combined_df = pd.concat(csv_files, ignore_index=True)
 
-# Save the combined dataframe to a new CSV file
-combined_df.to_csv(
-    "C:/Users/ASUS/Desktop/Thames' Work/Data Science Project 2024/New CSV/combined_output.csv",
-    index=False,
-)
+def scan_file(file_path, chunksize=100_000):
+    """Find the first row of each title in a file, only reading the Title column.
+
+    Returns the row count, the first row of every title in row order and the
+    digests of those titles.
+    """
+    digests = [
+        title_digests(chunk["Title"])
+        for chunk in iter_table(file_path, chunksize=chunksize, columns=["Title"])
+    ]
+    digests = np.concatenate(digests) if digests else np.array([], dtype=np.uint64)
+    unique, first_rows = np.unique(digests, return_index=True)
+    order = np.argsort(first_rows)
+    return len(digests), first_rows[order], unique[order], table_columns(file_path)
+
+
+def combine_files(file_paths, output_file, workers=os.cpu_count(), chunksize=100_000):
+    """Combine the files into one, keeping only the first row of each title."""
+    # Phase one: find the first rows of each file in parallel, then drop the titles
+    # an earlier file already had. Only the kept rows are remembered, so memory
+    # grows with the unique titles
+    seen = set()
+    plans = []
+    columns = {}
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        scans = executor.map(scan_file, file_paths, [chunksize] * len(file_paths))
+        for rows, first_rows, digests, file_columns in scans:
+            new = np.array([digest not in seen for digest in digests.tolist()], bool)
+            seen.update(digests[new].tolist())
+            plans.append((rows, first_rows[new], digests[new]))
+            # Every file gets the columns of all files, like pd.concat did
+            columns.update(dict.fromkeys(file_columns))
+            total_rows += rows
+    columns = list(columns)
+
+    # Phase two: stream every file again and only write the kept rows
+    with TableWriter(output_file) as writer:
+        for file_path, (rows, kept_rows, kept_digests) in zip(file_paths, plans):
+            offset = 0
+            position = 0
+            for chunk in iter_table(file_path, chunksize=chunksize):
+                stop = np.searchsorted(kept_rows, offset + len(chunk))
+                kept = chunk.iloc[kept_rows[position:stop] - offset]
+                # The full read must see the same rows as the Title-only read
+                if not np.array_equal(
+                    title_digests(kept["Title"]), kept_digests[position:stop]
+                ):
+                    raise ValueError(
+                        f"The rows of {file_path} moved between the two passes, "
+                        "check it for malformed lines"
+                    )
+                writer.write(kept.reindex(columns=columns))
+                offset += len(chunk)
+                position = stop
+            if offset != rows:
+                raise ValueError(
+                    f"{file_path} has {offset} rows, but {rows} when only reading "
+                    "the titles, check it for malformed lines"
+                )
+            print(f"Combined {file_path}")
+
+    print(f"Kept {writer.rows} of {total_rows} rows in {output_file}")
+    return writer.rows
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+
+    # Define the folder path where your CSV or Parquet files are stored
+    folder_path = (
+        "C:/Users/ASUS/Desktop/Thames' Work/Data Science Project 2024/Imputed Data"
+    )
+
+    # Collect every CSV or Parquet file in the folder
+    file_paths = [
+        os.path.join(folder_path, filename)
+        for filename in sorted(os.listdir(folder_path))
+        if filename.endswith((".csv", ".parquet"))
+    ]
+
+    # Combine and drop exact duplicate titles, remove_duplicates.py then reads this
+    # file for the near duplicates (the extension picks the format)
+    combine_files(
+        file_paths,
+        "C:/Users/ASUS/Desktop/Thames' Work/Data Science Project 2024/New CSV/combined_output.parquet",
+    )
+
+    print("Files have been combined successfully!")
 
-print("CSV files have been combined successfully!")
+    end_time = time.time()
+    elapsed_time = end_time - start_time
+    print(f"\nTime taken: {elapsed_time:.2f} seconds")
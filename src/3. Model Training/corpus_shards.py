@@ -0,0 +1,110 @@
+import json
+import os
+import pickle
+import shutil
+
+from scipy import sparse
+
+# Written next to the pickles of train_model.py, reset on every training
+CORPUS_FILE = "corpus.json"
+SHARD_FOLDER = "corpus_updates"
+
+
+def save_json(value, file_path):
+    with open(file_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(value, f, indent=4, ensure_ascii=False)
+    os.replace(file_path + ".tmp", file_path)
+
+
+def reset_corpus(model_folder, documents):
+    """Start the corpus of a freshly trained model, without any update shards."""
+    shutil.rmtree(os.path.join(model_folder, SHARD_FOLDER), ignore_errors=True)
+    state = {
+        "documents": documents,
+        "applied": [],
+        "shards": [],
+        "clusters_stale": False,
+    }
+    save_json(state, os.path.join(model_folder, CORPUS_FILE))
+    return state
+
+
+def load_state(model_folder):
+    """The corpus state, made once from doc_term_matrix.pkl for older models.
+
+    Older models had every update written into their pickles, and the hashes of
+    those updates in update_history.json.
+    """
+    corpus_path = os.path.join(model_folder, CORPUS_FILE)
+    if os.path.exists(corpus_path):
+        with open(corpus_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    with open(os.path.join(model_folder, "doc_term_matrix.pkl"), "rb") as f:
+        documents = pickle.load(f).shape[0]
+    applied = []
+    history_path = os.path.join(model_folder, "update_history.json")
+    if os.path.exists(history_path):
+        with open(history_path, "r", encoding="utf-8") as f:
+            applied = [entry["hash"] for entry in json.load(f) if "hash" in entry]
+    state = {
+        "documents": documents,
+        "applied": applied,
+        "shards": [],
+        "clusters_stale": False,
+    }
+    save_json(state, corpus_path)
+    return state
+
+
+def append_shard(model_folder, state, documents, matrix, batch):
+    """Save the documents of one update as their own shard and count them.
+
+    batch is recorded with the shard, the file and hash of the update.
+    """
+    shard_folder = os.path.join(model_folder, SHARD_FOLDER)
+    os.makedirs(shard_folder, exist_ok=True)
+    shard_name = f"{len(state['shards']) + 1:04d}.pkl"
+    shard_path = os.path.join(shard_folder, shard_name)
+    with open(shard_path + ".tmp", "wb") as f:
+        pickle.dump((documents, matrix), f)
+    os.replace(shard_path + ".tmp", shard_path)
+
+    state["documents"] += matrix.shape[0]
+    if batch["hash"] not in state["applied"]:
+        state["applied"].append(batch["hash"])
+    state["shards"].append({"shard": shard_name, "documents": matrix.shape[0], **batch})
+    save_json(state, os.path.join(model_folder, CORPUS_FILE))
+    return state
+
+
+def load_corpus(model_folder):
+    """Every document and its row of counts, the training corpus then each shard.
+
+    Rows saved before the vocabulary grew get zeros for the words added later.
+    """
+    with open(os.path.join(model_folder, "documents.pkl"), "rb") as f:
+        documents = list(pickle.load(f))
+    with open(os.path.join(model_folder, "doc_term_matrix.pkl"), "rb") as f:
+        matrices = [pickle.load(f)]
+
+    corpus_path = os.path.join(model_folder, CORPUS_FILE)
+    if os.path.exists(corpus_path):
+        with open(corpus_path, "r", encoding="utf-8") as f:
+            shards = json.load(f)["shards"]
+        for shard in shards:
+            with open(
+                os.path.join(model_folder, SHARD_FOLDER, shard["shard"]), "rb"
+            ) as f:
+                shard_documents, matrix = pickle.load(f)
+            documents += shard_documents
+            matrices.append(matrix)
+
+    width = max(matrix.shape[1] for matrix in matrices)
+    matrices = [
+        sparse.csr_matrix(
+            (matrix.data, matrix.indices, matrix.indptr),
+            shape=(matrix.shape[0], width),
+        )
+        for matrix in (sparse.csr_matrix(matrix) for matrix in matrices)
+    ]
+    return documents, sparse.vstack(matrices, format="csr")
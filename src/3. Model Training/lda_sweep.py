@@ -0,0 +1,143 @@
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from sklearn.decomposition import LatentDirichletAllocation
+from threadpoolctl import threadpool_limits
+
+# Scores of every candidate that was fitted, and the best model itself
+SweepResult = namedtuple("SweepResult", ["scores", "perplexities", "best_model"])
+
+# Set once in every worker process, so the matrix is not sent with each candidate
+_doc_term_matrix = None
+_thread_limits = None
+
+
+def parse_topics(text):
+    """Read a grid like "2:10" (inclusive), "5:50:5" or "2,4,8,16"."""
+    if ":" in text:
+        start, stop, *step = (int(part) for part in text.split(":"))
+        return list(range(start, stop + 1, step[0] if step else 1))
+    return sorted({int(part) for part in text.split(",")})
+
+
+def init_worker(doc_term_matrix, threads):
+    global _doc_term_matrix, _thread_limits
+    _doc_term_matrix = doc_term_matrix
+    # Each worker gets its share of the cores, instead of every BLAS using all of them
+    _thread_limits = threadpool_limits(limits=threads)
+
+
+def fit_candidate(n_topics, lda_params):
+    lda = LatentDirichletAllocation(n_components=n_topics, **lda_params)
+    lda.fit(_doc_term_matrix)
+    return lda
+
+
+def stop_index(topics, perplexities, patience):
+    """Where the sweep stops, after patience candidates in a row without a lower perplexity.
+
+    Only the candidates fitted without gaps from the start are looked at, so the
+    answer does not depend on which worker finished first.
+    """
+    best = float("inf")
+    since_best = 0
+    for index, n_topics in enumerate(topics):
+        if n_topics not in perplexities:
+            return None
+        if perplexities[n_topics] < best:
+            best = perplexities[n_topics]
+            since_best = 0
+        else:
+            since_best += 1
+            if since_best >= patience:
+                return index
+    return None
+
+
+def sweep_topics(
+    doc_term_matrix,
+    topics,
+    score,
+    random_state=42,
+    max_iter=10,
+    evaluate_every=-1,
+    perp_tol=0.1,
+    patience=None,
+    workers=None,
+):
+    """Fit an LDA model for every number of topics in a process pool.
+
+    score(lda) rates a fitted model, higher is better, and the best model is returned
+    so it never has to be refit. With evaluate_every > 0 a fit stops once its
+    perplexity changes by less than perp_tol. With patience, the larger topic counts
+    are cancelled once that many candidates in a row did not lower the perplexity.
+    """
+    topics = sorted(topics)
+    lda_params = {
+        "random_state": random_state,
+        "max_iter": max_iter,
+        "evaluate_every": evaluate_every,
+        "perp_tol": perp_tol,
+    }
+    workers = min(workers or os.cpu_count(), len(topics))
+    threads = max(1, os.cpu_count() // workers)
+
+    models = {}
+    perplexities = {}
+    stop = None
+    if workers == 1:
+        init_worker(doc_term_matrix, threads)
+        for n_topics in topics:
+            models[n_topics] = fit_candidate(n_topics, lda_params)
+            perplexities[n_topics] = models[n_topics].bound_
+            print(f"n_topics={n_topics}, Perplexity={perplexities[n_topics]:.1f}")
+            if patience and stop_index(topics, perplexities, patience) is not None:
+                break
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(doc_term_matrix, threads),
+        ) as executor:
+            # Submitted smallest first, so a stop cancels the slowest candidates
+            pending = {
+                executor.submit(fit_candidate, n_topics, lda_params): n_topics
+                for n_topics in topics
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    n_topics = pending.pop(future)
+                    models[n_topics] = future.result()
+                    perplexities[n_topics] = models[n_topics].bound_
+                    print(
+                        f"n_topics={n_topics}, Perplexity={perplexities[n_topics]:.1f}"
+                    )
+                if patience and stop is None:
+                    stop = stop_index(topics, perplexities, patience)
+                    if stop is not None:
+                        for future in pending:
+                            future.cancel()
+                        pending = {
+                            future: n_topics
+                            for future, n_topics in pending.items()
+                            if not future.cancelled()
+                        }
+
+    # Candidates past the stop that were already running are left out
+    stop = stop_index(topics, perplexities, patience) if patience else None
+    kept = topics[: stop + 1] if stop is not None else list(models)
+    if len(kept) < len(topics):
+        print(f"Stopped after n_topics={kept[-1]}, the perplexity stopped improving")
+
+    scores = {}
+    for n_topics in sorted(kept):
+        scores[n_topics] = score(models[n_topics])
+        print(f"n_topics={n_topics}, Coherence={scores[n_topics]:.3f}")
+    best_topics = max(scores, key=scores.get)
+    return SweepResult(
+        scores,
+        {n_topics: perplexities[n_topics] for n_topics in scores},
+        models[best_topics],
+    )
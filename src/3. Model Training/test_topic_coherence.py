@@ -0,0 +1,70 @@
+import itertools
+import math
+import unittest
+
+import numpy as np
+
+from topic_coherence import CoherenceScorer
+
+
+def brute_force(documents, topic, measure):
+    """Score one topic pair by pair, straight from the sets of words."""
+    n_docs = len(documents)
+    scores = []
+    for first, second in itertools.combinations(topic, 2):
+        with_first = sum(first in document for document in documents)
+        with_second = sum(second in document for document in documents)
+        both = sum(first in document and second in document for document in documents)
+        if measure == "umass":
+            scores.append(math.log((both + 1) / with_first))
+        elif both == 0:
+            scores.append(-1.0)
+        elif both == n_docs:
+            scores.append(1.0)
+        else:
+            joint = both / n_docs
+            pmi = math.log(joint / (with_first / n_docs * with_second / n_docs))
+            scores.append(pmi / -math.log(joint))
+    return sum(scores) / len(scores)
+
+
+class CoherenceScorerTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        matrix = (rng.random((40, 12)) < 0.3).astype(int) * rng.integers(1, 4, (40, 12))
+        # Word 0 and 1 are in every document, 2 and 3 always appear together and
+        # 4 and 5 never do
+        matrix[:, :2] = 1
+        matrix[:, 3] = matrix[:, 2] = np.arange(40) % 3 == 0
+        matrix[:, 5] = (matrix[:, 4] > 0) == 0
+        self.matrix = matrix
+        self.documents = [set(np.flatnonzero(row)) for row in matrix]
+        self.scorer = CoherenceScorer(matrix)
+
+    def check(self, components, top_n):
+        topics = self.scorer.top_words(components, top_n)
+        for measure in ("umass", "npmi"):
+            scores = getattr(self.scorer, measure)(components, top_n)
+            expected = [brute_force(self.documents, topic, measure) for topic in topics]
+            np.testing.assert_allclose(scores, expected, rtol=1e-6, atol=1e-9)
+
+    def test_matches_brute_force(self):
+        components = np.random.default_rng(1).random((5, self.matrix.shape[1]))
+        self.check(components, top_n=6)
+
+    def test_pairs_in_every_document(self):
+        components = np.zeros((1, self.matrix.shape[1]))
+        components[0, :2] = [2, 1]
+        self.check(components, top_n=2)
+        self.assertEqual(self.scorer.npmi(components, top_n=2)[0], 1.0)
+
+    def test_pairs_always_or_never_together(self):
+        components = np.zeros((2, self.matrix.shape[1]))
+        components[0, 2:4] = [2, 1]
+        components[1, 4:6] = [2, 1]
+        self.check(components, top_n=2)
+        np.testing.assert_allclose(self.scorer.npmi(components, top_n=2), [1, -1])
+
+
+if __name__ == "__main__":
+    unittest.main()
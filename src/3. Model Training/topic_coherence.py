@@ -0,0 +1,77 @@
+import numpy as np
+from scipy import sparse
+
+# Added inside the logs so word pairs that never co-occur stay finite
+EPSILON = 1e-12
+
+
+class CoherenceScorer:
+    """Topic coherence from the document co-occurrence of words.
+
+    The counts come from the same doc_term_matrix the models were fitted on. Pairs
+    are only counted between the top words of the topics being scored, never over
+    the whole vocabulary.
+    """
+
+    def __init__(self, doc_term_matrix):
+        # Columns are sliced for every score, which is cheap in CSC
+        binary = sparse.csc_matrix(doc_term_matrix, dtype=np.float64, copy=True)
+        binary.data[:] = 1
+        self.binary = binary
+        self.n_docs = binary.shape[0]
+        # Documents containing each word
+        self.doc_freq = np.asarray(binary.sum(axis=0)).ravel()
+
+    def top_words(self, components, top_n=10):
+        """The top_n words of every topic, the highest weighted first."""
+        top_n = min(top_n, components.shape[1])
+        top = np.argpartition(components, -top_n, axis=1)[:, -top_n:]
+        order = np.argsort(-np.take_along_axis(components, top, axis=1), axis=1)
+        return np.take_along_axis(top, order, axis=1)
+
+    def word_pairs(self, components, top_n=10):
+        """Every pair of top words of every topic, the higher ranked word first."""
+        top = self.top_words(components, top_n)
+        first, second = np.triu_indices(top.shape[1], k=1)
+        return top[:, first], top[:, second]
+
+    def pair_counts(self, first, second):
+        """Documents containing each pair of words, counted over those words only."""
+        words = np.unique(np.concatenate([first.ravel(), second.ravel()]))
+        columns = self.binary[:, words]
+        cooccurrence = (columns.T @ columns).toarray()
+        return cooccurrence[
+            np.searchsorted(words, first), np.searchsorted(words, second)
+        ]
+
+    def umass(self, components, top_n=10):
+        """UMass coherence of each topic, the mean of log((D(wi, wj) + 1) / D(wi)).
+
+        It is always negative, closer to zero is more coherent.
+        """
+        first, second = self.word_pairs(components, top_n)
+        counts = self.pair_counts(first, second)
+        return np.log((counts + 1) / self.doc_freq[first]).mean(axis=1)
+
+    def npmi(self, components, top_n=10):
+        """Normalised pointwise mutual information of each topic, from -1 to 1."""
+        first, second = self.word_pairs(components, top_n)
+        counts = self.pair_counts(first, second)
+        joint = counts / self.n_docs
+        independent = (self.doc_freq[first] / self.n_docs) * (
+            self.doc_freq[second] / self.n_docs
+        )
+        pmi = np.log((joint + EPSILON) / independent)
+        # Clipped so the denominator stays positive when a pair is in every document
+        npmi = pmi / -np.log(np.clip(joint, EPSILON, 1 - EPSILON))
+        # Words that never appear together are as incoherent as it gets, words that
+        # are in every document together are as coherent
+        npmi[counts == 0] = -1.0
+        npmi[counts == self.n_docs] = 1.0
+        npmi = np.clip(npmi, -1.0, 1.0)
+        return npmi.mean(axis=1)
+
+    def score(self, lda_model, measure="npmi", top_n=10):
+        """The mean coherence of the topics of a fitted model, higher is better."""
+        per_topic = getattr(self, measure)(lda_model.components_, top_n)
+        return float(per_topic.mean())
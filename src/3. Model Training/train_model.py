@@ -0,0 +1,384 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from collections import namedtuple
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.feature_extraction.text import CountVectorizer
+
+# Shared helpers from Data Prep
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "1. Data Prep")
+)
+from corpus_shards import reset_corpus
+from country_resolver import CountryResolver
+from lda_sweep import parse_topics, sweep_topics
+from row_splitter import SPLIT_COLUMNS, split_rows
+from topic_coherence import CoherenceScorer
+from table_io import read_table
+
+# The result of a stage and the key it was cached under
+StageResult = namedtuple("StageResult", ["key", "value"])
+
+
+def file_hash(file_path):
+    """Hash the content of a file without loading it all at once."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Pickle the result of every stage under a hash of its inputs and parameters."""
+
+    def __init__(self, cache_folder, fresh=False):
+        self.cache_folder = cache_folder
+        # With fresh=True every stage is recomputed, and the cache is overwritten
+        self.fresh = fresh
+        os.makedirs(cache_folder, exist_ok=True)
+
+    def source(self, file_path):
+        """The input file as a stage, keyed by its content."""
+        return StageResult(file_hash(file_path), file_path)
+
+    def key(self, name, inputs, params):
+        text = json.dumps(
+            [name, [result.key for result in inputs], params],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=20).hexdigest()
+
+    def run(self, name, func, *inputs, **params):
+        """Run func on the values of the input stages, unless it already ran on them.
+
+        Only the keys of the inputs are hashed, so a stage is skipped as soon as
+        everything upstream of it is unchanged.
+        """
+        key = self.key(name, inputs, params)
+        cache_path = os.path.join(self.cache_folder, f"{name}-{key}.pkl")
+        if not self.fresh and os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                value = pickle.load(f)
+            print(f"{name:<14}cached")
+            return StageResult(key, value)
+
+        start_time = time.time()
+        value = func(*[result.value for result in inputs], **params)
+        # Write to a temporary file first so a crash never leaves half a pickle
+        with open(cache_path + ".tmp", "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(cache_path + ".tmp", cache_path)
+        print(f"{name:<14}{time.time() - start_time:.2f} seconds")
+        return StageResult(key, value)
+
+
+def explode_rows(file_path):
+    """Load the training data with one row per country and institution of a paper."""
+    df = split_rows(read_table(file_path), SPLIT_COLUMNS)
+    # Like the notebook, rows missing any value are dropped
+    return df.dropna().reset_index(drop=True)
+
+
+def clean_countries(df, score_cutoff=80):
+    # Same resolver as impute_missing_value.py, each distinct name is only matched once
+    country_resolver = CountryResolver(score_cutoff=score_cutoff)
+    country_mapping = country_resolver.resolve_many(df["Country"])
+    df = df.copy()
+    df["Country"] = df["Country"].map(country_mapping)
+    return df
+
+
+def keyword_documents(df):
+    """Keywords are lists, join them into one document per row."""
+    return (
+        df["Keywords"]
+        .map(
+            lambda keywords: (
+                " ".join(keywords)
+                if isinstance(keywords, (list, np.ndarray))
+                else keywords
+            )
+        )
+        .tolist()
+    )
+
+
+def vectorize(df):
+    """Join the keywords of each row into one document and count its words."""
+    documents = keyword_documents(df)
+    vectorizer = CountVectorizer(stop_words="english")
+    doc_term_matrix = vectorizer.fit_transform(documents)
+    return documents, vectorizer, doc_term_matrix
+
+
+def topic_sweep(
+    vectorized,
+    topics=range(2, 11),
+    random_state=42,
+    max_iter=10,
+    evaluate_every=-1,
+    perp_tol=0.1,
+    patience=None,
+    coherence="npmi",
+    top_n=10,
+    workers=None,
+):
+    """Fit an LDA model for every number of topics in parallel and keep the best."""
+    _, _, doc_term_matrix = vectorized
+    # Document counts are shared, pairs are only counted between each model's top words
+    scorer = CoherenceScorer(doc_term_matrix)
+    return sweep_topics(
+        doc_term_matrix,
+        topics,
+        partial(scorer.score, measure=coherence, top_n=top_n),
+        random_state=random_state,
+        max_iter=max_iter,
+        evaluate_every=evaluate_every,
+        perp_tol=perp_tol,
+        patience=patience,
+        workers=workers,
+    )
+
+
+def topic_model(vectorized, sweep, top_words=5):
+    """The best model of the sweep with its document topics, and a name per topic."""
+    _, vectorizer, doc_term_matrix = vectorized
+    lda = sweep.best_model
+    doc_topic_matrix = lda.transform(doc_term_matrix)
+
+    feature_names = vectorizer.get_feature_names_out()
+    topic_names = [
+        " ".join(feature_names[i] for i in topic.argsort()[-top_words:][::-1])
+        for topic in lda.components_
+    ]
+    return lda, topic_names, doc_topic_matrix
+
+
+def fit_kmeans(lda_result, n_clusters=None, random_state=42):
+    """Cluster the documents by their topic mix, one cluster per topic by default."""
+    lda, _, doc_topic_matrix = lda_result
+    kmeans = KMeans(
+        n_clusters=n_clusters or lda.n_components, random_state=random_state
+    )
+    labels = kmeans.fit_predict(doc_topic_matrix)
+    return kmeans, labels
+
+
+def cluster_names(lda_result, kmeans_result, top_topics=3):
+    """Name every cluster after the topics its documents share the most."""
+    _, topic_names, doc_topic_matrix = lda_result
+    kmeans, labels = kmeans_result
+    names = {}
+    for cluster in range(kmeans.n_clusters):
+        members = doc_topic_matrix[labels == cluster]
+        if not len(members):
+            continue
+        avg_topic_distribution = members.mean(axis=0)
+        top_topic_indices = avg_topic_distribution.argsort()[-top_topics:][::-1]
+        names[cluster] = ", ".join(topic_names[i] for i in top_topic_indices)
+    return names
+
+
+def name_clusters(df, lda_result, kmeans_result, names=None, top_topics=3):
+    """The topic mix and named cluster of every row.
+
+    names maps each cluster to its name, by default they come from these rows.
+    """
+    _, topic_names, doc_topic_matrix = lda_result
+    _, labels = kmeans_result
+    if names is None:
+        names = cluster_names(lda_result, kmeans_result, top_topics)
+    topic_df = pd.DataFrame(doc_topic_matrix, columns=topic_names)
+    final_df = pd.concat(
+        [df[["Institution", "Country"]].reset_index(drop=True), topic_df], axis=1
+    )
+    final_df["Cluster"] = labels
+
+    final_df["Cluster Name"] = final_df["Cluster"].map(
+        lambda x: f"Cluster {x}: {names.get(x, 'Unknown')}"
+    )
+    return final_df
+
+
+def institution_clusters(final_df):
+    """The most frequent cluster of every institution."""
+    country_cluster_counts = (
+        final_df.groupby(["Institution", "Cluster Name", "Country"], observed=True)
+        .size()
+        .reset_index(name="count")
+    )
+    return country_cluster_counts.loc[
+        country_cluster_counts.groupby("Institution")["count"].idxmax()
+    ].reset_index(drop=True)
+
+
+def save_pickle(value, file_path):
+    with open(file_path + ".tmp", "wb") as f:
+        pickle.dump(value, f)
+    os.replace(file_path + ".tmp", file_path)
+
+
+def train(
+    file_path,
+    output_folder,
+    cache_folder=None,
+    topics=range(2, 11),
+    lda_seed=42,
+    max_iter=10,
+    evaluate_every=-1,
+    perp_tol=0.1,
+    patience=None,
+    coherence="npmi",
+    workers=None,
+    n_clusters=None,
+    kmeans_seed=42,
+    fresh=False,
+):
+    """Run every stage, reusing the cached ones, and save the models and tables."""
+    os.makedirs(output_folder, exist_ok=True)
+    cache = StageCache(
+        cache_folder or os.path.join(output_folder, "stage_cache"), fresh=fresh
+    )
+
+    source = cache.source(file_path)
+    exploded = cache.run("explode", explode_rows, source)
+    cleaned = cache.run("countries", clean_countries, exploded)
+    vectorized = cache.run("vectorize", vectorize, cleaned)
+    # The number of workers does not change the result, so it is not part of the key
+    sweep = cache.run(
+        "topic_sweep",
+        partial(topic_sweep, workers=workers),
+        vectorized,
+        topics=list(topics),
+        random_state=lda_seed,
+        max_iter=max_iter,
+        evaluate_every=evaluate_every,
+        perp_tol=perp_tol,
+        patience=patience,
+        coherence=coherence,
+    )
+    lda_result = cache.run("lda", topic_model, vectorized, sweep)
+    kmeans_result = cache.run(
+        "kmeans",
+        fit_kmeans,
+        lda_result,
+        n_clusters=n_clusters,
+        random_state=kmeans_seed,
+    )
+    final = cache.run(
+        "cluster_names", name_clusters, cleaned, lda_result, kmeans_result
+    )
+    institutions = cache.run("institutions", institution_clusters, final)
+
+    # The same pickles data_visualisation.py loads
+    documents, vectorizer, doc_term_matrix = vectorized.value
+    lda, topic_names, _ = lda_result.value
+    save_pickle(documents, os.path.join(output_folder, "documents.pkl"))
+    save_pickle(doc_term_matrix, os.path.join(output_folder, "doc_term_matrix.pkl"))
+    save_pickle(vectorizer, os.path.join(output_folder, "vectorizer.pkl"))
+    save_pickle(lda, os.path.join(output_folder, "lda_model_fitted.pkl"))
+    save_pickle(lda.n_components, os.path.join(output_folder, "best_n_topics.pkl"))
+    save_pickle(kmeans_result.value[0], os.path.join(output_folder, "kmeans_model.pkl"))
+    # update_model.py names the clusters of new batches with these
+    save_pickle(
+        cluster_names(lda_result.value, kmeans_result.value),
+        os.path.join(output_folder, "cluster_names.pkl"),
+    )
+    # A new model starts without the shards and stale clusters of update_model.py
+    reset_corpus(output_folder, doc_term_matrix.shape[0])
+    final.value.to_csv(os.path.join(output_folder, "topic_clusters.csv"), index=False)
+    institutions.value.to_csv(
+        os.path.join(output_folder, "institution_clusters.csv"), index=False
+    )
+
+    print(f"\nTopics: {topic_names}")
+    print(f"Saved the models and tables to {output_folder}")
+    return final.value, institutions.value
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train the LDA and KMeans models, reusing every unchanged stage."
+    )
+    parser.add_argument("input", help="Training data (E.g. data.csv or data.parquet)")
+    parser.add_argument(
+        "--output",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "Pickle"),
+        help="Folder for the pickled models and the result tables",
+    )
+    parser.add_argument(
+        "--cache", help="Stage cache folder, defaults to stage_cache in the output"
+    )
+    parser.add_argument(
+        "--topics",
+        type=parse_topics,
+        default="2:10",
+        help='Topic counts to try, e.g. "2:10", "5:50:5" or "2,4,8,16"',
+    )
+    parser.add_argument("--lda-seed", type=int, default=42)
+    parser.add_argument("--max-iter", type=int, default=10)
+    parser.add_argument(
+        "--evaluate-every",
+        type=int,
+        default=-1,
+        help="Check the perplexity every n iterations and stop a fit once it settles",
+    )
+    parser.add_argument("--perp-tol", type=float, default=0.1)
+    parser.add_argument(
+        "--patience",
+        type=int,
+        help="Stop the sweep after this many topic counts without a lower perplexity",
+    )
+    parser.add_argument(
+        "--coherence",
+        choices=["npmi", "umass"],
+        default="npmi",
+        help="How the topic counts are compared, over the top 10 words of each topic",
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Sweep processes, defaults to one per core"
+    )
+    parser.add_argument(
+        "--clusters", type=int, help="KMeans clusters, defaults to the best topics"
+    )
+    parser.add_argument("--kmeans-seed", type=int, default=42)
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Recompute every stage, e.g. after changing this file",
+    )
+    args = parser.parse_args()
+
+    start_time = time.time()
+    train(
+        args.input.replace("\\", "/"),
+        args.output,
+        cache_folder=args.cache,
+        topics=args.topics,
+        lda_seed=args.lda_seed,
+        max_iter=args.max_iter,
+        evaluate_every=args.evaluate_every,
+        perp_tol=args.perp_tol,
+        patience=args.patience,
+        coherence=args.coherence,
+        workers=args.workers,
+        n_clusters=args.clusters,
+        kmeans_seed=args.kmeans_seed,
+        fresh=args.fresh,
+    )
+    elapsed_time = time.time() - start_time
+    print(f"\nTime taken: {elapsed_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import argparse
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.special import psi
+from sklearn.base import clone
+
+from corpus_shards import append_shard, load_state, save_json
+from train_model import (
+    clean_countries,
+    cluster_names,
+    explode_rows,
+    file_hash,
+    keyword_documents,
+    name_clusters,
+    save_pickle,
+)
+
+
+def load_pickle(file_path):
+    with open(file_path, "rb") as f:
+        return pickle.load(f)
+
+
+def grow_vocabulary(vectorizer, documents):
+    """A copy of the vectorizer that also knows the new words, appended at the end.
+
+    The old words keep their columns, so the fitted topics still line up with them.
+    """
+    analyzer = vectorizer.build_analyzer()
+    vocabulary = dict(vectorizer.vocabulary_)
+    new_words = []
+    for document in documents:
+        for word in analyzer(document):
+            if word not in vocabulary:
+                vocabulary[word] = len(vocabulary)
+                new_words.append(word)
+    grown = clone(vectorizer).set_params(vocabulary=vocabulary)
+    return grown.fit([]), new_words
+
+
+def extend_topics(lda, new_words):
+    """Give every topic the new words, weighted by the prior as nothing was seen yet."""
+    extra = np.full((lda.n_components, new_words), lda.topic_word_prior_)
+    lda.components_ = np.hstack([lda.components_, extra])
+    # partial_fit reads this instead of components_, keep it in step
+    lda.exp_dirichlet_component_ = np.exp(
+        psi(lda.components_) - psi(lda.components_.sum(axis=1))[:, np.newaxis]
+    )
+    lda.n_features_in_ = lda.components_.shape[1]
+
+
+def topic_words(lda, feature_names, top_words=5):
+    return [
+        [feature_names[i] for i in topic.argsort()[-top_words:][::-1]]
+        for topic in lda.components_
+    ]
+
+
+def topic_drift(previous, current):
+    """Hellinger distance between each topic's words before and after, from 0 to 1."""
+    # Words added by this update had no weight in the previous topics
+    previous = np.hstack(
+        [previous, np.zeros((previous.shape[0], current.shape[1] - previous.shape[1]))]
+    )
+    previous = previous / previous.sum(axis=1, keepdims=True)
+    current = current / current.sum(axis=1, keepdims=True)
+    return np.sqrt(0.5 * ((np.sqrt(previous) - np.sqrt(current)) ** 2).sum(axis=1))
+
+
+def load_history(history_path):
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def legacy_cluster_names(model_folder, lda, kmeans, topic_names, sample=5000):
+    """Names for models trained before cluster_names.pkl, from a sample of the corpus."""
+    doc_term_matrix = load_pickle(os.path.join(model_folder, "doc_term_matrix.pkl"))
+    rows = np.random.default_rng(42).permutation(doc_term_matrix.shape[0])[:sample]
+    matrix = sparse.csr_matrix(doc_term_matrix[np.sort(rows)])
+    # The saved rows do not have the words added since, they count as zero
+    matrix = sparse.csr_matrix(
+        (matrix.data, matrix.indices, matrix.indptr),
+        shape=(matrix.shape[0], lda.components_.shape[1]),
+    )
+    doc_topic_matrix = lda.transform(matrix)
+    return cluster_names(
+        (lda, topic_names, doc_topic_matrix),
+        (kmeans, kmeans.predict(doc_topic_matrix)),
+    )
+
+
+def update_model(
+    file_path,
+    model_folder,
+    fixed_vocabulary=False,
+    passes=1,
+    force=False,
+    stale_drift=0.2,
+):
+    """Train the saved LDA model further on a new batch of papers, without a refit.
+
+    Only the new documents are vectorized, fitted and saved, as their own shard in
+    corpus_updates, so an update costs the same however large the corpus grew. They
+    are assigned to the saved KMeans clusters under the names they got in training.
+    The clusters are not refit, once a topic drifts more than stale_drift they are
+    marked stale until the next train_model.py run. A batch that was already applied
+    is skipped unless force is set.
+    """
+    # Applying a batch twice would count its documents twice
+    state = load_state(model_folder)
+    batch_hash = file_hash(file_path)
+    if not force and batch_hash in state["applied"]:
+        print(f"{file_path} was already applied, use --force to apply it again")
+        return None
+
+    vectorizer = load_pickle(os.path.join(model_folder, "vectorizer.pkl"))
+    lda = load_pickle(os.path.join(model_folder, "lda_model_fitted.pkl"))
+    kmeans = load_pickle(os.path.join(model_folder, "kmeans_model.pkl"))
+
+    df = clean_countries(explode_rows(file_path))
+    new_documents = keyword_documents(df)
+    previous_words = topic_words(lda, vectorizer.get_feature_names_out())
+    previous_components = lda.components_.copy()
+
+    new_words = []
+    if not fixed_vocabulary:
+        vectorizer, new_words = grow_vocabulary(vectorizer, new_documents)
+        extend_topics(lda, len(new_words))
+    # With a fixed vocabulary, words the model has never seen are left out
+    new_matrix = vectorizer.transform(new_documents)
+
+    # The batch is weighted as its share of every document seen so far
+    lda.total_samples = state["documents"] + new_matrix.shape[0]
+    for _ in range(passes):
+        lda.partial_fit(new_matrix)
+
+    drift = topic_drift(previous_components, lda.components_)
+    current_words = topic_words(lda, vectorizer.get_feature_names_out())
+    topic_names = [" ".join(words) for words in current_words]
+    print(f"Updated on {new_matrix.shape[0]} documents, {len(new_words)} new words")
+    print(f"\n{'Topic':<7}{'Drift':>7}  Top words")
+    for topic, distance in enumerate(drift):
+        print(f"{topic:<7}{distance:>7.3f}  {topic_names[topic]}")
+        entered = [
+            word for word in current_words[topic] if word not in previous_words[topic]
+        ]
+        if entered:
+            print(f"{'':<16}new: {', '.join(entered)}")
+    print(f"Mean drift: {drift.mean():.3f}")
+
+    # Assign the new documents to the saved clusters, under the names from training
+    names_path = os.path.join(model_folder, "cluster_names.pkl")
+    if os.path.exists(names_path):
+        names = load_pickle(names_path)
+    else:
+        names = legacy_cluster_names(model_folder, lda, kmeans, topic_names)
+        save_pickle(names, names_path)
+    doc_topic_matrix = lda.transform(new_matrix)
+    labels = kmeans.predict(doc_topic_matrix)
+    final_df = name_clusters(
+        df, (lda, topic_names, doc_topic_matrix), (kmeans, labels), names
+    )
+
+    # KMeans was fitted on the topics from training, it is not refit here
+    if drift.max() > stale_drift:
+        state["clusters_stale"] = True
+    if state["clusters_stale"]:
+        print(
+            "The topics drifted since the clusters were fitted, "
+            "rerun train_model.py to refit them"
+        )
+
+    save_pickle(vectorizer, os.path.join(model_folder, "vectorizer.pkl"))
+    save_pickle(lda, os.path.join(model_folder, "lda_model_fitted.pkl"))
+    # Saved last, so the batch only counts as applied once the models are saved
+    append_shard(
+        model_folder,
+        state,
+        new_documents,
+        new_matrix,
+        {"file": file_path, "hash": batch_hash},
+    )
+
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    final_df.to_csv(
+        os.path.join(model_folder, f"topic_clusters_{name}.csv"), index=False
+    )
+
+    # Keep every update with its drift, to see how the topics move year by year
+    history_path = os.path.join(model_folder, "update_history.json")
+    history = load_history(history_path)
+    history.append(
+        {
+            "file": file_path,
+            "hash": batch_hash,
+            "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "documents": new_matrix.shape[0],
+            "total_documents": state["documents"],
+            "new_words": len(new_words),
+            "drift": drift.round(4).tolist(),
+            "topics": topic_names,
+            "clusters_stale": state["clusters_stale"],
+        }
+    )
+    save_json(history, history_path)
+    return drift
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Update the saved LDA model with a new batch of papers."
+    )
+    parser.add_argument("input", help="New data (E.g. 2025.csv or 2025.parquet)")
+    parser.add_argument(
+        "--model",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "Pickle"),
+        help="Folder with the pickles saved by train_model.py",
+    )
+    parser.add_argument(
+        "--fixed-vocabulary",
+        action="store_true",
+        help="Ignore words the vectorizer does not know instead of adding them",
+    )
+    parser.add_argument(
+        "--passes", type=int, default=1, help="Times to go over the new batch"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Apply the batch even if it was already applied to this model",
+    )
+    parser.add_argument(
+        "--stale-drift",
+        type=float,
+        default=0.2,
+        help="Topic drift after which the KMeans clusters are marked stale",
+    )
+    args = parser.parse_args()
+
+    start_time = time.time()
+    update_model(
+        args.input.replace("\\", "/"),
+        args.model,
+        fixed_vocabulary=args.fixed_vocabulary,
+        passes=args.passes,
+        force=args.force,
+        stale_drift=args.stale_drift,
+    )
+    elapsed_time = time.time() - start_time
+    print(f"\nTime taken: {elapsed_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
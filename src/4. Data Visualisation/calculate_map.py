@@ -1,14 +1,22 @@
-import ast
+import os
+import sys
 import time
 
 import pandas as pd
 from geopy.geocoders import Nominatim
 
+# Shared helpers from Data Prep
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "1. Data Prep")
+)
+from table_io import read_table
+
 
 def load_dataset():
-    file_path = "C:/Users/ASUS/Desktop/Thames Work/Data Science Project 2024/New CSV/no_dupes.csv"
+    file_path = "C:/Users/ASUS/Desktop/Thames Work/Data Science Project 2024/New CSV/no_dupes.parquet"
     try:
-        data = pd.read_csv(file_path, on_bad_lines="warn")
+        # Only the countries are needed for the map
+        data = read_table(file_path, columns=["Country"])
         return data
     except Exception as e:
         return pd.DataFrame()
@@ -28,9 +36,9 @@ def get_country_coordinates(country_name):
 
 def calculate_map(df_dataset, output_filename="country_frequency.csv"):
     df = df_dataset
-    df["Country"] = df["Country"].apply(ast.literal_eval)
-    country_list = [country for sublist in df["Country"] for country in sublist]
-    country_freq = pd.Series(country_list).value_counts().reset_index()
+    # Countries are either already exploded or still a list per paper
+    country_list = df["Country"].astype(object).explode().dropna()
+    country_freq = country_list.value_counts().reset_index()
     country_freq.columns = ["country", "frequency"]
     country_freq["coordinates"] = country_freq["country"].apply(get_country_coordinates)
     country_freq = country_freq[
@@ -1,5 +1,6 @@
-import ast
+import os
 import pickle
+import sys
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -11,13 +12,26 @@ import streamlit as st
 from sklearn.decomposition import PCA
 from sklearn.feature_extraction.text import CountVectorizer
 
+# Shared helpers from Data Prep
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "1. Data Prep")
+)
+from table_io import read_table
+
+# The corpus with the shards added by update_model.py
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3. Model Training")
+)
+from corpus_shards import load_corpus
+
 
 @st.cache_data
 # The main dataset is obtained from combining the Scorpus dataset and web scraping dataset
 # After combining both datasets, we then remove duplicated titles.
-def load_dataset(file_path):
+def load_dataset(file_path, columns=None):
     try:
-        data = pd.read_csv(file_path, on_bad_lines="warn")
+        # CSV or Parquet, list columns come back as lists either way
+        data = read_table(file_path, columns=columns)
         return data
     except Exception as e:
         st.error(f"Failed to load data: {e}")
@@ -48,17 +62,15 @@ def load_map_data(file_path):
 
 @st.cache_data
 def load_document():
-    # Load the documents list from the pickle file
-    with open("documents.pkl", "rb") as f:
-        documents = pickle.load(f)
-        return documents
+    # Load the documents list from the pickle file and the update shards
+    documents, _ = load_corpus(".")
+    return documents
 
 
 @st.cache_data
 def load_doc_term_matrix():
-    with open("doc_term_matrix.pkl", "rb") as f:
-        doc_term_matrix = pickle.load(f)
-        return doc_term_matrix
+    _, doc_term_matrix = load_corpus(".")
+    return doc_term_matrix
 
 
 @st.cache_data
@@ -266,10 +278,6 @@ def show_cluster(df):
 
 def show_country_insights(data):
     st.header("• Top Contributing Countries")
-    if isinstance(data["Country"].iloc[0], str) and data["Country"].iloc[0].startswith(
-        "["
-    ):
-        data["Country"] = data["Country"].apply(ast.literal_eval)
     if isinstance(data["Country"].iloc[0], list):
         data = data.explode("Country")
     country_data = data["Country"].value_counts().head(10)
@@ -355,7 +363,11 @@ def show_LDA():
 
 
 def run():
-    dataset = load_dataset("main_data.csv")
+    # Prefer the typed Parquet file when it is there
+    if os.path.exists("main_data.parquet"):
+        dataset = load_dataset("main_data.parquet")
+    else:
+        dataset = load_dataset("main_data.csv")
     df_dataset = pd.DataFrame(dataset)
 
     cluster_data = load_cluster_data("cluster_data.csv")